@@ -1,21 +1,21 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from database import get_database
+from user_cache import principal_cache
+from password_hashing import password_hasher
 from models import TokenData, User
 from config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -42,10 +42,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
+    # Serve warm requests from the principal cache without a database round trip
+    user = principal_cache.get(token_data.email)
+    if user is not None:
+        return user
+    
     db = await get_database()
     user = await db.recruitment_portal.users.find_one({"email": token_data.email})
     if user is None:
         raise credentials_exception
+    principal_cache.set(token_data.email, user)
     return user
 
 async def get_current_admin_user(current_user: dict = Depends(get_current_user)):
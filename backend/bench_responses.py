@@ -0,0 +1,72 @@
+"""
+Compare the old list response path (per-document conversion loop + jsonable_encoder +
+JSONResponse) with BSONJSONResponse on synthetic candidate documents.
+
+    python bench_responses.py [documents] [repeats]
+"""
+import copy
+import sys
+import time
+from datetime import datetime
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from responses import BSONJSONResponse, with_ids
+
+def make_candidate(index: int) -> dict:
+    candidate = {
+        "_id": ObjectId(),
+        "name": f"Candidate {index}",
+        "email": f"candidate{index}@example.com",
+        "phone": "9876543210",
+        "job_id": f"jb{index:06d}",
+        "status": "applied",
+        "created_by": str(ObjectId()),
+        "created_at": datetime.utcnow(),
+        "client_deployment_details": ["Client A", "Client B"],
+        "work_experience_entries": [
+            {"company": f"Company {n}", "role": "Engineer", "start_date": "2020-01-01", "end_date": "2022-01-01",
+             "responsibilities": "Built and maintained services. " * 5}
+            for n in range(3)
+        ],
+        "skill_assessments": [
+            {"skill": f"Skill {n}", "years": n + 1, "rating": 4, "comments": "Solid hands-on experience."}
+            for n in range(5)
+        ],
+    }
+    # Pad to the ~100 flat fields a real candidate document carries
+    for n in range(90):
+        candidate[f"field_{n}"] = f"value {n} for candidate {index}"
+    return candidate
+
+def old_path(candidates: list) -> bytes:
+    for candidate in candidates:
+        candidate["id"] = str(candidate["_id"])
+        del candidate["_id"]
+        if "created_at" in candidate and isinstance(candidate["created_at"], datetime):
+            candidate["created_at"] = candidate["created_at"].isoformat()
+    return JSONResponse(jsonable_encoder(candidates)).body
+
+def new_path(candidates: list) -> bytes:
+    return BSONJSONResponse(with_ids(candidates)).body
+
+def bench(name: str, render, documents: list, repeats: int) -> float:
+    best = None
+    for _ in range(repeats):
+        payload = copy.deepcopy(documents)
+        started = time.perf_counter()
+        body = render(payload)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<28} best of {repeats}: {best * 1000:8.1f} ms  ({len(body) / 1024:.0f} KiB)")
+    return best
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    documents = [make_candidate(index) for index in range(count)]
+
+    print(f"{count} candidate documents")
+    old = bench("loop + jsonable_encoder", old_path, documents, repeats)
+    new = bench("BSONJSONResponse (orjson)", new_path, documents, repeats)
+    print(f"speedup: {old / new:.1f}x")
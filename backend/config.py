@@ -27,11 +27,58 @@ class Settings:
     
     # Background Task Configuration
     JOB_STATUS_CHECK_INTERVAL: int = int(os.getenv("JOB_STATUS_CHECK_INTERVAL", "3600"))
+    # How long one worker keeps the expiry sweep lease; defaults to one check interval
+    JOB_EXPIRY_LEASE_SECONDS: int = int(os.getenv("JOB_EXPIRY_LEASE_SECONDS", str(JOB_STATUS_CHECK_INTERVAL)))
+    JOB_EXPIRY_SWEEP_CHUNK_SIZE: int = int(os.getenv("JOB_EXPIRY_SWEEP_CHUNK_SIZE", "500"))
+    # Random delay added to each wait so that workers do not sweep in lockstep
+    JOB_STATUS_CHECK_JITTER_SECONDS: int = int(os.getenv("JOB_STATUS_CHECK_JITTER_SECONDS", "60"))
     REAL_TIME_POLLING_INTERVAL: int = int(os.getenv("REAL_TIME_POLLING_INTERVAL", "300000"))
     
+    # Scheduler Configuration
+    SCHEDULER_SHUTDOWN_TIMEOUT_SECONDS: int = int(os.getenv("SCHEDULER_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+    
+    # Metrics Configuration
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Shared directory where each uvicorn worker writes its samples so /metrics can sum them;
+    # leave empty to report only the worker that serves the scrape
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS: int = int(os.getenv("METRICS_FLUSH_SECONDS", "15"))
+    
+    # Slow Query Log Configuration
+    SLOW_QUERY_LOG_ENABLED: bool = os.getenv("SLOW_QUERY_LOG_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS: int = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    # explain() each query shape at most once per this many seconds
+    SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS: int = int(os.getenv("SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS", "600"))
+    # Write JSON lines to this file instead of the capped slow_queries collection
+    SLOW_QUERY_LOG_FILE: str = os.getenv("SLOW_QUERY_LOG_FILE", "")
+    SLOW_QUERY_COLLECTION_MAX_BYTES: int = int(os.getenv("SLOW_QUERY_COLLECTION_MAX_BYTES", str(16 * 1024 * 1024)))
+    
     # Database Query Limits
     MAX_QUERY_LIMIT: int = int(os.getenv("MAX_QUERY_LIMIT", "100"))
     MAX_QUERY_LIMIT_LARGE: int = int(os.getenv("MAX_QUERY_LIMIT_LARGE", "1000"))
     MAX_QUERY_LIMIT_MEDIUM: int = int(os.getenv("MAX_QUERY_LIMIT_MEDIUM", "200"))
+    
+    # Reconcile declared indexes when the API starts
+    ENSURE_INDEXES_ON_STARTUP: bool = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+    
+    # Authentication Cache Configuration
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "1000"))
+    
+    # Password Hashing Configuration
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    
+    # Report Export Configuration
+    REPORT_WIDTH_SAMPLE_ROWS: int = int(os.getenv("REPORT_WIDTH_SAMPLE_ROWS", "1000"))
+    REPORT_STREAM_CHUNK_SIZE: int = int(os.getenv("REPORT_STREAM_CHUNK_SIZE", str(64 * 1024)))
+    # Documents fetched per cursor batch by the bulk exports
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    
+    # Pagination Configuration (count=estimate stops counting at this many matches)
+    PAGINATION_COUNT_LIMIT: int = int(os.getenv("PAGINATION_COUNT_LIMIT", "10000"))
+    
+    # Job Import Configuration (documents per insert_many call)
+    JOB_IMPORT_CHUNK_SIZE: int = int(os.getenv("JOB_IMPORT_CHUNK_SIZE", "1000"))
 
 settings = Settings() 
\ No newline at end of file
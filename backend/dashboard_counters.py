@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+from pymongo import UpdateOne, ReplaceOne, DeleteOne
+from database import get_database, connect_to_mongo, close_mongo_connection
+from leases import acquire_lease, release_lease
+from metrics import registry, Counter as MetricCounter
+
+logger = logging.getLogger(__name__)
+
+counter_update_failures = registry.register(MetricCounter(
+    "dashboard_counter_update_failures_total",
+    "Dashboard counter updates that failed and left the counters drifting until a rebuild"
+))
+
+# Counter documents are keyed by (kind, hr_id, status, day):
+#   jobs       -> assigned_hr, status, start_date day
+#   candidates -> created_by,  status, created_at day
+JOB_KIND = "job"
+CANDIDATE_KIND = "candidate"
+STATE_ID = "dashboard_counters"
+REBUILD_LEASE = "dashboard_counters_rebuild"
+REBUILD_LEASE_SECONDS = 600
+
+# Set once the counters have been built, so dashboards can read them
+_counters_ready = False
+
+def day_key(value) -> Optional[str]:
+    """Return the YYYY-MM-DD day a date field falls on (dates may be stored as datetimes or strings)."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str):
+        return value[:10] or None
+    return None
+
+def _day_expression(field: str) -> dict:
+    """Aggregation equivalent of day_key()."""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": [{"$type": field}, "date"]},
+             "then": {"$dateToString": {"format": "%Y-%m-%d", "date": field}}},
+            {"case": {"$eq": [{"$type": field}, "string"]},
+             "then": {"$substrCP": [field, 0, 10]}}
+        ],
+        "default": None
+    }}
+
+def job_counter_key(job: dict) -> tuple:
+    return (JOB_KIND, job.get("assigned_hr"), job.get("status"), day_key(job.get("start_date")))
+
+def candidate_counter_key(candidate: dict) -> tuple:
+    return (CANDIDATE_KIND, candidate.get("created_by"), candidate.get("status"), day_key(candidate.get("created_at")))
+
+def _counter_id(key: tuple) -> str:
+    return "|".join(part or "" for part in key)
+
+def _counter_fields(key: tuple) -> dict:
+    kind, hr_id, status, day = key
+    return {"kind": kind, "hr_id": hr_id, "status": status, "day": day}
+
+async def apply_counter_deltas(deltas: Counter, session=None):
+    """
+    Apply {counter_key: delta} to the counters collection with a single bulk write.
+    Inside a transaction (`session`) errors propagate so the write and its counters commit
+    or abort together. Otherwise counter maintenance never fails the calling request:
+    failures are logged and counted, and the drift is repaired by `verify`/`rebuild`.
+    """
+    operations = [
+        UpdateOne(
+            {"_id": _counter_id(key)},
+            {"$inc": {"count": delta}, "$setOnInsert": _counter_fields(key)},
+            upsert=True
+        )
+        for key, delta in deltas.items() if delta
+    ]
+    if not operations:
+        return
+
+    db = await get_database()
+    if session is not None:
+        await db.recruitment_portal.dashboard_counters.bulk_write(operations, ordered=False, session=session)
+        return
+
+    try:
+        await db.recruitment_portal.dashboard_counters.bulk_write(operations, ordered=False)
+    except Exception:
+        counter_update_failures.inc()
+        logger.error("Error updating dashboard counters; run 'python dashboard_counters.py verify'", exc_info=True)
+
+async def record_job_change(before: Optional[dict], after: Optional[dict]):
+    """Move a job between counters; pass None as before for inserts and as after for deletes."""
+    deltas = Counter()
+    if before is not None:
+        deltas[job_counter_key(before)] -= 1
+    if after is not None:
+        deltas[job_counter_key(after)] += 1
+    await apply_counter_deltas(deltas)
+
+async def record_jobs_created(jobs: Iterable[dict]):
+    await apply_counter_deltas(Counter(job_counter_key(job) for job in jobs))
+
+async def record_jobs_removed(jobs: Iterable[dict], session=None):
+    deltas = Counter()
+    for job in jobs:
+        deltas[job_counter_key(job)] -= 1
+    await apply_counter_deltas(deltas, session=session)
+
+async def record_candidate_change(before: Optional[dict], after: Optional[dict]):
+    """Move a candidate between counters; pass None as before for inserts and as after for deletes."""
+    deltas = Counter()
+    if before is not None:
+        deltas[candidate_counter_key(before)] -= 1
+    if after is not None:
+        deltas[candidate_counter_key(after)] += 1
+    await apply_counter_deltas(deltas)
+
+async def counters_ready() -> bool:
+    """True once the counters have been built at least once."""
+    global _counters_ready
+    if not _counters_ready:
+        db = await get_database()
+        state = await db.recruitment_portal.maintenance_state.find_one({"_id": STATE_ID})
+        _counters_ready = state is not None
+    return _counters_ready
+
+async def read_status_counts(kind: str, hr_id: Optional[str] = None,
+                             day_from: Optional[str] = None, day_to: Optional[str] = None) -> Dict[str, int]:
+    """Sum the counters for one kind into {status: count}, optionally for one HR and a day range."""
+    db = await get_database()
+    match = {"kind": kind}
+    if hr_id:
+        match["hr_id"] = hr_id
+    if day_from or day_to:
+        match["day"] = {}
+        if day_from:
+            match["day"]["$gte"] = day_from
+        if day_to:
+            match["day"]["$lte"] = day_to
+
+    groups = await db.recruitment_portal.dashboard_counters.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$status", "count": {"$sum": "$count"}}}
+    ]).to_list(length=None)
+    return {group["_id"]: group["count"] for group in groups if group["count"]}
+
+async def compute_counters() -> Dict[tuple, int]:
+    """Count jobs and candidates from scratch, keyed the same way as the counters."""
+    db = await get_database()
+
+    async def group(collection, kind, hr_field, day_field):
+        groups = await collection.aggregate([
+            {"$group": {
+                "_id": {
+                    "hr_id": f"${hr_field}",
+                    "status": "$status",
+                    "day": _day_expression(f"${day_field}")
+                },
+                "count": {"$sum": 1}
+            }}
+        ], allowDiskUse=True).to_list(length=None)
+        return {
+            (kind, g["_id"].get("hr_id"), g["_id"].get("status"), g["_id"].get("day") or None): g["count"]
+            for g in groups
+        }
+
+    job_counts, candidate_counts = await asyncio.gather(
+        group(db.recruitment_portal.jobs, JOB_KIND, "assigned_hr", "start_date"),
+        group(db.recruitment_portal.candidates, CANDIDATE_KIND, "created_by", "created_at")
+    )
+    return {**job_counts, **candidate_counts}
+
+async def read_counters() -> Dict[tuple, int]:
+    db = await get_database()
+    counters = {}
+    async for doc in db.recruitment_portal.dashboard_counters.find({"count": {"$ne": 0}}):
+        counters[(doc["kind"], doc.get("hr_id"), doc.get("status"), doc.get("day"))] = doc["count"]
+    return counters
+
+async def verify_counters() -> list:
+    """Return the counters that differ from a fresh count as [{key, expected, actual}]."""
+    expected, actual = await asyncio.gather(compute_counters(), read_counters())
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: tuple(part or "" for part in k)):
+        if expected.get(key, 0) != actual.get(key, 0):
+            mismatches.append({
+                "key": _counter_fields(key),
+                "expected": expected.get(key, 0),
+                "actual": actual.get(key, 0)
+            })
+    return mismatches
+
+async def rebuild_counters() -> int:
+    """
+    Recompute every counter from the jobs and candidates collections.
+    Writes that land while the rebuild runs may need another `verify`/`rebuild`.
+    """
+    global _counters_ready
+    db = await get_database()
+    expected = await compute_counters()
+    existing_ids = set(await db.recruitment_portal.dashboard_counters.distinct("_id"))
+
+    operations = [
+        ReplaceOne({"_id": _counter_id(key)}, {**_counter_fields(key), "count": count}, upsert=True)
+        for key, count in expected.items()
+    ]
+    expected_ids = {_counter_id(key) for key in expected}
+    operations.extend(DeleteOne({"_id": counter_id}) for counter_id in existing_ids - expected_ids)
+
+    if operations:
+        await db.recruitment_portal.dashboard_counters.bulk_write(operations, ordered=False)
+
+    await db.recruitment_portal.maintenance_state.update_one(
+        {"_id": STATE_ID},
+        {"$set": {"rebuilt_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    _counters_ready = True
+    return len(expected)
+
+async def ensure_dashboard_counters():
+    """Build the counters on first start; only one worker does it."""
+    try:
+        if await counters_ready():
+            return
+        if not await acquire_lease(REBUILD_LEASE, REBUILD_LEASE_SECONDS):
+            return
+        try:
+            built = await rebuild_counters()
+            print(f"Built {built} dashboard counters")
+        finally:
+            await release_lease(REBUILD_LEASE)
+    except Exception as e:
+        print(f"Error building dashboard counters: {e}")
+
+async def main(command: str):
+    await connect_to_mongo()
+    try:
+        if command == "rebuild":
+            built = await rebuild_counters()
+            print(f"Rebuilt {built} dashboard counters")
+        elif command == "verify":
+            mismatches = await verify_counters()
+            if not mismatches:
+                print("Dashboard counters match the jobs and candidates collections")
+            for mismatch in mismatches:
+                print(f"  {mismatch['key']}: expected {mismatch['expected']}, stored {mismatch['actual']}")
+            if mismatches:
+                print(f"Found {len(mismatches)} mismatched counters; run 'python dashboard_counters.py rebuild'")
+        else:
+            print("Usage: python dashboard_counters.py [rebuild|verify]")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else ""))
@@ -0,0 +1,44 @@
+from typing import Dict
+
+JOB_STATUSES = ["open", "closed", "submitted", "demand closed"]
+CANDIDATE_STATUSES = ["applied", "screen_reject", "interview_selected", "interview_reject", "no_show_for_joining", "placed"]
+
+def _status_key(status: str) -> str:
+    return status.replace(" ", "_")
+
+async def count_by_status(collection, base_match: dict, facets: Dict[str, dict]) -> Dict[str, Dict[str, int]]:
+    """
+    Count documents per status for several filters in a single aggregation.
+    base_match narrows the collection once; each facet applies its own extra filter
+    on top of it. Returns {facet_name: {status: count}}.
+    """
+    pipeline = [
+        {"$match": base_match},
+        {"$facet": {
+            name: [
+                {"$match": facet_match},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ]
+            for name, facet_match in facets.items()
+        }}
+    ]
+    result = await collection.aggregate(pipeline).to_list(length=1)
+    buckets = result[0] if result else {}
+    return {
+        name: {group["_id"]: group["count"] for group in buckets.get(name, [])}
+        for name in facets
+    }
+
+def job_status_summary(counts: Dict[str, int]) -> dict:
+    """Turn {status: count} for jobs into the dashboard's *_jobs fields."""
+    summary = {"total_jobs": sum(counts.values())}
+    for status in JOB_STATUSES:
+        summary[f"{_status_key(status)}_jobs"] = counts.get(status, 0)
+    return summary
+
+def candidate_status_summary(counts: Dict[str, int]) -> dict:
+    """Turn {status: count} for candidates into the dashboard's *_candidates fields."""
+    summary = {"total_candidates": sum(counts.values())}
+    for status in CANDIDATE_STATUSES:
+        summary[f"{_status_key(status)}_candidates"] = counts.get(status, 0)
+    return summary
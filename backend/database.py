@@ -1,5 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from config import settings
+import asyncio
+from metrics import event_listeners
+from slow_queries import slow_query_listener
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -10,7 +13,11 @@ async def get_database() -> AsyncIOMotorClient:
     return db.client
 
 async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    listeners = event_listeners() if settings.METRICS_ENABLED else []
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        listeners.append(slow_query_listener)
+    db.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=listeners)
+    slow_query_listener.attach(db.client, asyncio.get_running_loop())
     print("Connected to MongoDB Atlas")
 
 async def close_mongo_connection():
@@ -0,0 +1,42 @@
+import re
+from typing import Optional, Sequence
+from fastapi import HTTPException
+
+# Columns the candidate tables show and search on; full documents come from GET /candidates/{id}
+CANDIDATE_SUMMARY_FIELDS = (
+    "name", "email", "phone", "status", "notes",
+    "job_id", "job_title", "title_position", "role_applied_for",
+    "created_by", "created_at",
+    "current_location", "current_ctc", "expected_ctc",
+    "experience", "total_experience", "education", "education_degree_name",
+    "skills", "projects", "linkedin", "github"
+)
+
+# Always returned so that title enrichment, cursors and row actions keep working
+CANDIDATE_REQUIRED_FIELDS = ("job_id", "created_by", "created_at", "status")
+
+# Default export columns for jobs and archived jobs
+JOB_EXPORT_FIELDS = (
+    "job_id", "csa_id", "title", "description", "location", "status", "priority",
+    "assigned_hr", "start_date", "end_date",
+    "salary_band", "salary_rate", "salary_package", "profit_percentage", "expected_package",
+    "source_company", "uploaded_by", "created_at"
+)
+JOB_HISTORY_EXPORT_FIELDS = JOB_EXPORT_FIELDS + ("original_job_id", "moved_to_history_date")
+
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def projection_for(fields: Optional[str], default: Sequence[str], required: Sequence[str] = ()) -> Optional[dict]:
+    """
+    Inclusion projection for a `fields=` query parameter (comma separated top-level names).
+    No value means the endpoint's `default` summary fields; "all" means the whole document (None).
+    """
+    if fields is not None and fields.strip().lower() == "all":
+        return None
+
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(default)
+    for name in names:
+        if not _FIELD_NAME.match(name):
+            raise HTTPException(status_code=400, detail=f"Invalid field name: {name}")
+
+    return {name: 1 for name in [*names, *required]}
@@ -0,0 +1,48 @@
+from typing import List
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database import get_database
+from search import set_search_fields
+
+JOB_ID_SEQUENCE = "job_id"
+
+async def reserve_sequence(name: str, count: int = 1) -> int:
+    """
+    Atomically reserve `count` consecutive values of the named counter in the `sequences`
+    collection and return the first one. Values are never handed out twice; a failed insert
+    only leaves a gap.
+    """
+    db = await get_database()
+    for attempt in range(2):
+        try:
+            sequence = await db.recruitment_portal.sequences.find_one_and_update(
+                {"_id": name},
+                {"$inc": {"value": count}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return sequence["value"] - count + 1
+        except DuplicateKeyError:
+            # Two workers created the counter at the same time; the retry increments it
+            if attempt:
+                raise
+
+def format_job_id(value: int) -> str:
+    return f"jb{value:06d}"
+
+async def allocate_job_ids(count: int) -> List[str]:
+    """Reserve a block of job IDs in a single round trip."""
+    if count <= 0:
+        return []
+    first = await reserve_sequence(JOB_ID_SEQUENCE, count)
+    return [format_job_id(value) for value in range(first, first + count)]
+
+async def allocate_job_id() -> str:
+    return (await allocate_job_ids(1))[0]
+
+async def assign_job_ids(jobs: List[dict]) -> List[dict]:
+    """Give each new job document an ID from one reserved block (and its search prefixes)."""
+    for job, job_id in zip(jobs, await allocate_job_ids(len(jobs))):
+        job["job_id"] = job_id
+        set_search_fields(job)
+    return jobs
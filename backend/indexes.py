@@ -0,0 +1,197 @@
+import asyncio
+import sys
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from database import get_database, connect_to_mongo, close_mongo_connection
+from search import TEXT_INDEX_KEYS, TEXT_INDEX_WEIGHTS
+
+class IndexSpec:
+    """One index a query path relies on, with the reason it exists."""
+
+    def __init__(self, keys: list, reason: str, unique: bool = False, partial_filter: Optional[dict] = None,
+                 weights: Optional[dict] = None):
+        self.keys = keys
+        self.reason = reason
+        self.unique = unique
+        self.partial_filter = partial_filter
+        self.weights = weights
+
+    @property
+    def is_text(self) -> bool:
+        return any(direction == "text" for _, direction in self.keys)
+
+    @property
+    def key_signature(self) -> tuple:
+        """The index key as list_indexes reports it (text indexes are stored as _fts/_ftsx)."""
+        if self.is_text:
+            return (("_fts", "text"), ("_ftsx", 1))
+        return tuple(self.keys)
+
+    @property
+    def name(self) -> str:
+        # Same naming scheme as pymongo's default index names
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def model(self) -> IndexModel:
+        options = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.partial_filter:
+            options["partialFilterExpression"] = self.partial_filter
+        if self.weights:
+            options["weights"] = self.weights
+        return IndexModel(self.keys, **options)
+
+    def differences(self, existing: dict) -> List[str]:
+        """Describe how an existing index with the same keys differs from this spec."""
+        differences = []
+        if bool(existing.get("unique")) != self.unique:
+            differences.append(f"unique is {bool(existing.get('unique'))}, expected {self.unique}")
+        if existing.get("partialFilterExpression") != self.partial_filter:
+            differences.append(
+                f"partial filter is {existing.get('partialFilterExpression')}, expected {self.partial_filter}"
+            )
+        if self.is_text:
+            expected_weights = self.weights or {field: 1 for field, _ in self.keys}
+            if existing.get("weights") != expected_weights:
+                differences.append(f"weights are {existing.get('weights')}, expected {expected_weights}")
+        return differences
+
+# Required indexes per collection
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "jobs": [
+        IndexSpec([("job_id", ASCENDING)], "job lookups by job_id", unique=True),
+        IndexSpec([("csa_id", ASCENDING)], "CSA uniqueness checks on import", unique=True,
+                  partial_filter={"csa_id": {"$gt": ""}}),
+        IndexSpec([("assigned_hr", ASCENDING), ("status", ASCENDING)], "HR job lists and dashboard"),
+        IndexSpec([("status", ASCENDING), ("end_date", ASCENDING)], "expiry sweep"),
+        IndexSpec([("start_date", ASCENDING)], "job list, dashboard and report date ranges"),
+        IndexSpec([("created_at", DESCENDING), ("_id", DESCENDING)], "job list ordering and cursors"),
+        IndexSpec([("assigned_hr", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], "HR job list ordering and cursors"),
+        IndexSpec(TEXT_INDEX_KEYS, "job search", weights=TEXT_INDEX_WEIGHTS),
+        IndexSpec([("search_prefixes", ASCENDING)], "job_id / csa_id prefix search"),
+    ],
+    "candidates": [
+        IndexSpec([("job_id", ASCENDING), ("status", ASCENDING)], "candidates per job and expiry sweep lookups"),
+        IndexSpec([("created_by", ASCENDING), ("status", ASCENDING)], "per-HR candidate counts and HR report"),
+        IndexSpec([("status", ASCENDING), ("created_at", ASCENDING)], "HR revenue by placement period"),
+        IndexSpec([("created_at", DESCENDING), ("_id", DESCENDING)], "candidate list ordering and cursors"),
+    ],
+    "application_history": [
+        IndexSpec([("candidate_id", ASCENDING), ("timestamp", DESCENDING)], "candidate application history"),
+    ],
+    "job_history": [
+        IndexSpec([("original_job_id", ASCENDING)], "prevents archiving a job twice", unique=True),
+        IndexSpec([("moved_to_history_date", DESCENDING), ("_id", DESCENDING)], "job history list ordering and cursors"),
+        IndexSpec([("job_id", ASCENDING)], "job history exact ID search"),
+        IndexSpec([("csa_id", ASCENDING)], "job history exact ID search"),
+        IndexSpec(TEXT_INDEX_KEYS, "job history search", weights=TEXT_INDEX_WEIGHTS),
+        IndexSpec([("search_prefixes", ASCENDING)], "job_id / csa_id prefix search"),
+    ],
+    "users": [
+        IndexSpec([("email", ASCENDING)], "login and token principal lookups", unique=True),
+        IndexSpec([("role", ASCENDING)], "HR user lists"),
+    ],
+    "dashboard_counters": [
+        IndexSpec([("kind", ASCENDING), ("hr_id", ASCENDING), ("day", ASCENDING)], "dashboard counter reads"),
+    ],
+}
+
+async def _index_usage(collection) -> Dict[str, int]:
+    """Operations served per index since the server last restarted (needs $indexStats privileges)."""
+    try:
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(length=None)
+    except OperationFailure:
+        return {}
+    return {stat["name"]: stat["accesses"]["ops"] for stat in stats}
+
+async def reconcile_indexes(create: bool = True) -> dict:
+    """
+    Compare the declared indexes with the database and create the missing ones.
+    Idempotent: existing indexes are left alone. Returns, per collection, which indexes were
+    created, failed, conflict with the declaration, are not declared, or have never been used.
+    """
+    db = await get_database()
+    report = {}
+
+    for collection_name, specs in INDEXES.items():
+        collection = db.recruitment_portal[collection_name]
+        existing = await collection.list_indexes().to_list(length=None)
+        existing_by_keys = {tuple(index["key"].items()): index for index in existing}
+        usage = await _index_usage(collection)
+
+        collection_report = {"created": [], "missing": [], "failed": [], "conflicts": [], "undeclared": [], "unused": []}
+        declared_names = set()
+
+        for spec in specs:
+            current = existing_by_keys.get(spec.key_signature)
+            if current is not None:
+                declared_names.add(current["name"])
+                differences = spec.differences(current)
+                if differences:
+                    collection_report["conflicts"].append({"index": current["name"], "differences": differences})
+                continue
+
+            if not create:
+                collection_report["missing"].append(spec.name)
+                continue
+            try:
+                await collection.create_indexes([spec.model()])
+                collection_report["created"].append(spec.name)
+                declared_names.add(spec.name)
+            except OperationFailure as e:
+                # e.g. duplicate values already present for a unique index
+                collection_report["failed"].append({"index": spec.name, "error": str(e)})
+
+        for index in existing:
+            if index["name"] != "_id_" and index["name"] not in declared_names:
+                collection_report["undeclared"].append(index["name"])
+        collection_report["unused"] = sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_")
+
+        report[collection_name] = collection_report
+
+    return report
+
+def print_report(report: dict):
+    for collection_name, collection_report in report.items():
+        print(f"{collection_name}:")
+        for index in collection_report["created"]:
+            print(f"  created   {index}")
+        for index in collection_report["missing"]:
+            print(f"  missing   {index}")
+        for failure in collection_report["failed"]:
+            print(f"  FAILED    {failure['index']}: {failure['error']}")
+        for conflict in collection_report["conflicts"]:
+            print(f"  conflict  {conflict['index']}: {'; '.join(conflict['differences'])}")
+        for index in collection_report["undeclared"]:
+            print(f"  undeclared {index}")
+        for index in collection_report["unused"]:
+            print(f"  unused    {index} (no operations since server restart)")
+
+async def ensure_indexes():
+    """Reconcile indexes at startup, logging anything that needs attention."""
+    try:
+        report = await reconcile_indexes()
+        for collection_name, collection_report in report.items():
+            for index in collection_report["created"]:
+                print(f"Created index {collection_name}.{index}")
+            for failure in collection_report["failed"]:
+                print(f"Could not create index {collection_name}.{failure['index']}: {failure['error']}")
+            for conflict in collection_report["conflicts"]:
+                print(f"Index {collection_name}.{conflict['index']} differs from its declaration: {'; '.join(conflict['differences'])}")
+    except Exception as e:
+        print(f"Error reconciling indexes: {e}")
+
+async def main(args: list):
+    await connect_to_mongo()
+    try:
+        report = await reconcile_indexes(create="--check" not in args)
+        print_report(report)
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    # python indexes.py          create missing indexes and report
+    # python indexes.py --check  report only
+    asyncio.run(main(sys.argv[1:]))
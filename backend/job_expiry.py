@@ -0,0 +1,17 @@
+from config import settings
+from leases import acquire_lease
+from routes.shared import update_expired_job_statuses
+
+EXPIRY_SWEEP_LEASE = "job_expiry_sweep"
+
+async def run_expiry_sweep():
+    """
+    Run one expired-job sweep if this worker can take the sweep lease.
+    The lease is kept until it expires so that only one worker sweeps per interval,
+    no matter how many uvicorn workers are running.
+    """
+    if not await acquire_lease(EXPIRY_SWEEP_LEASE, settings.JOB_EXPIRY_LEASE_SECONDS):
+        print("Expiry sweep skipped: lease is held by another worker")
+        return None
+
+    return await update_expired_job_statuses()
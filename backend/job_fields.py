@@ -0,0 +1,138 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from bson.decimal128 import Decimal128
+from fastapi import HTTPException
+
+# Job fields stored as numbers (doubles) so that money rollups can run inside MongoDB
+MONEY_FIELDS = ("salary_package", "expected_package", "profit_percentage")
+
+class InvalidNumber(ValueError):
+    pass
+
+def to_number(value) -> Optional[float]:
+    """
+    Parse a money or percentage value into a float.
+    Blank values become None; anything else that is not a number raises InvalidNumber.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise InvalidNumber(f"{value!r} is not a number")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+
+    text = str(value).strip().replace(",", "")
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        raise InvalidNumber(f"{value!r} is not a number")
+
+def normalize_money_fields(job: dict) -> dict:
+    """Convert the money fields present in a job payload to numbers, rejecting bad values with a 400."""
+    for field in MONEY_FIELDS:
+        if field in job:
+            try:
+                job[field] = to_number(job[field])
+            except InvalidNumber:
+                raise HTTPException(status_code=400, detail=f"{field} must be a number")
+    return job
+
+# Job dates are stored as BSON datetimes (UTC)
+DATE_FIELDS = ("start_date", "end_date")
+
+class InvalidDate(ValueError):
+    pass
+
+def _parse_day_first(text: str) -> Optional[datetime]:
+    """Parse DD-MM-YYYY or DD/MM/YYYY, returning None if the text is not in that form."""
+    parts = text.replace("/", "-").split("-")
+    if len(parts) != 3 or len(parts[2]) != 4 or not all(part.isdigit() for part in parts):
+        return None
+    try:
+        return datetime(int(parts[2]), int(parts[1]), int(parts[0]), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def to_utc_datetime(value) -> Optional[datetime]:
+    """
+    Parse a job date into an aware UTC datetime.
+    Accepts datetimes, dates, ISO 8601 strings (including YYYY-MM-DD) and DD-MM-YYYY strings.
+    Blank values become None; anything else raises InvalidDate.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return to_utc_datetime(datetime.fromisoformat(text.replace("Z", "+00:00")))
+    except ValueError:
+        pass
+    parsed = _parse_day_first(text)
+    if parsed is None:
+        raise InvalidDate(f"{value!r} is not a valid date")
+    return parsed
+
+def normalize_date_fields(job: dict) -> dict:
+    """Convert the date fields present in a job payload to UTC datetimes, rejecting bad values with a 400."""
+    for field in DATE_FIELDS:
+        if field in job:
+            try:
+                job[field] = to_utc_datetime(job[field])
+            except InvalidDate:
+                raise HTTPException(status_code=400, detail=f"{field} must be a valid date")
+    return job
+
+def start_of_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def parse_day(value: str, field: str) -> datetime:
+    """Parse a date query parameter to the start of that day (UTC), rejecting bad values with a 400."""
+    try:
+        parsed = to_utc_datetime(value)
+    except InvalidDate:
+        parsed = None
+    if parsed is None:
+        raise HTTPException(status_code=400, detail=f"{field} must be a valid date")
+    return start_of_day(parsed)
+
+def day_range(start: Optional[str] = None, end: Optional[str] = None,
+              start_field: str = "start_date", end_field: str = "end_date") -> dict:
+    """
+    Build an inclusive day range predicate from YYYY-MM-DD query parameters,
+    as {"$gte": start of first day, "$lt": start of the day after the last day}.
+    """
+    predicate = {}
+    if start:
+        predicate["$gte"] = parse_day(start, start_field)
+    if end:
+        predicate["$lt"] = parse_day(end, end_field) + timedelta(days=1)
+    return predicate
+
+def report_date_range(report_type: Optional[str], custom_start_date: Optional[str] = None,
+                      custom_end_date: Optional[str] = None) -> dict:
+    """
+    Date range predicate for the weekly / monthly / custom report filters (whole days, UTC),
+    or {} when no date filter applies.
+    """
+    tomorrow = start_of_day(datetime.now(timezone.utc)) + timedelta(days=1)
+    if report_type == "weekly":
+        # Last 7 days
+        return {"$gte": tomorrow - timedelta(days=8), "$lt": tomorrow}
+    if report_type == "monthly":
+        # Last 30 days
+        return {"$gte": tomorrow - timedelta(days=31), "$lt": tomorrow}
+    if report_type == "custom" and custom_start_date and custom_end_date:
+        return day_range(custom_start_date, custom_end_date, "custom_start_date", "custom_end_date")
+    return {}
@@ -0,0 +1,134 @@
+import warnings
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, List, Tuple
+import pandas as pd
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+from config import settings
+
+# Accepted header names for each job column (matched case-insensitively)
+UPLOAD_COLUMNS = {
+    'title': ['title', 'job title', 'job_title'],
+    'description': ['description', 'job description', 'job_description'],
+    'location': ['location'],
+    'csa_id': ['csa_id', 'csa id', 'csaid'],
+    'start_date': ['start_date', 'start date', 'startdate'],
+    'end_date': ['end_date', 'end date', 'enddate']
+}
+TEXT_COLUMNS = ('title', 'description', 'location', 'csa_id')
+DATE_COLUMNS = ('start_date', 'end_date')
+
+# Spreadsheet row number of the first data row (row 1 is the header)
+FIRST_DATA_ROW = 2
+
+def read_upload(file: BinaryIO, file_extension: str) -> pd.DataFrame:
+    if file_extension == 'csv':
+        return pd.read_csv(file)
+    return pd.read_excel(file, engine='openpyxl')
+
+def map_columns(df: pd.DataFrame) -> Dict[str, str]:
+    """Map each job column to the uploaded column holding it, rejecting the file if any is missing."""
+    actual_columns = {str(col).lower().strip(): col for col in reversed(list(df.columns))}
+    mapped_columns = {}
+    missing_columns = []
+    for required_col, possible_names in UPLOAD_COLUMNS.items():
+        found = next((actual_columns[name] for name in possible_names if name in actual_columns), None)
+        if found is None:
+            missing_columns.append(required_col)
+        else:
+            mapped_columns[required_col] = found
+
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
+    return mapped_columns
+
+def _text_column(column: pd.Series) -> pd.Series:
+    return column.where(column.notna(), "").astype(str).str.strip()
+
+def _date_column(column: pd.Series, now: datetime) -> Tuple[pd.Series, pd.Series]:
+    """
+    Parse a date column to UTC (naive values are taken as UTC). Blank cells default to `now`.
+    Returns the parsed column and a mask of the cells that could not be parsed.
+    """
+    blank = column.isna() | (column.astype(str).str.strip() == "")
+    with warnings.catch_warnings():
+        # pandas warns when it cannot infer one format and falls back to per-cell parsing
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(column.where(~blank), errors="coerce", utc=True)
+        if parsed[~blank].isna().any():
+            # Cells in a different format from the first one: parse those individually
+            retry = ~blank & parsed.isna()
+            parsed[retry] = pd.to_datetime(column[retry].astype(str), errors="coerce", utc=True, format="mixed")
+    invalid = ~blank & parsed.isna()
+    return parsed.fillna(pd.Timestamp(now)), invalid
+
+def build_job_documents(df: pd.DataFrame, file_extension: str, uploaded_by: str) -> Tuple[List[dict], List[dict]]:
+    """
+    Turn an uploaded sheet into job documents using whole-column operations.
+    Returns the documents to insert (each tagged with its spreadsheet `_row`, job IDs are
+    assigned by the caller) and the rows rejected during validation as {"row_index", "reasons"}.
+    """
+    mapped_columns = map_columns(df)
+    now = datetime.now(timezone.utc)
+    rows = pd.Series(range(FIRST_DATA_ROW, FIRST_DATA_ROW + len(df)), index=df.index)
+
+    jobs = pd.DataFrame({column: _text_column(df[mapped_columns[column]]) for column in TEXT_COLUMNS})
+    reasons = pd.Series([[] for _ in range(len(df))], index=df.index, dtype=object)
+    for column in DATE_COLUMNS:
+        jobs[column], invalid = _date_column(df[mapped_columns[column]], now)
+        for index in invalid[invalid].index:
+            reasons[index].append(f"invalid {column}")
+
+    jobs["_row"] = rows
+
+    rejected = reasons.map(len) > 0
+    skipped_rows = [
+        {"row_index": int(rows[index]), "reasons": reasons[index]}
+        for index in rejected[rejected].index
+    ]
+
+    documents = jobs[~rejected].to_dict("records")
+    for doc in documents:
+        for column in DATE_COLUMNS:
+            doc[column] = doc[column].to_pydatetime()
+        doc.update({
+            "salary_package": None,  # No longer required in new format
+            "source_company": f"{file_extension.upper()} Upload",
+            "uploaded_by": uploaded_by,
+            "status": "open",
+            "created_at": now
+        })
+    return documents, skipped_rows
+
+def parse_job_upload(file: BinaryIO, file_extension: str, uploaded_by: str) -> Tuple[List[dict], List[dict]]:
+    """Read and validate an uploaded job sheet; CPU-bound, so run it in the threadpool."""
+    return build_job_documents(read_upload(file, file_extension), file_extension, uploaded_by)
+
+def _write_error_reason(error: dict) -> str:
+    if error.get("code") == 11000:
+        field = next(iter(error.get("keyPattern") or {}), "key")
+        return f"{field} already exists in database"
+    return error.get("errmsg", "insert failed")
+
+async def insert_jobs(collection, documents: List[dict], chunk_size: int = None) -> Tuple[List[dict], Dict[int, str]]:
+    """
+    Insert job documents with unordered insert_many calls of `chunk_size` documents.
+    Returns the inserted documents and, for the ones that failed (e.g. duplicate csa_id),
+    their position in `documents` mapped to the reason.
+    """
+    chunk_size = chunk_size or settings.JOB_IMPORT_CHUNK_SIZE
+    inserted = []
+    failures = {}
+    for start in range(0, len(documents), chunk_size):
+        chunk = documents[start:start + chunk_size]
+        try:
+            await collection.insert_many(chunk, ordered=False)
+            inserted.extend(chunk)
+        except BulkWriteError as e:
+            errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+            for index, doc in enumerate(chunk):
+                if index in errors:
+                    failures[start + index] = _write_error_reason(errors[index])
+                else:
+                    inserted.append(doc)
+    return inserted, failures
@@ -0,0 +1,49 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database import get_database
+
+# Identifies this worker process as a lease holder
+LEASE_HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+async def acquire_lease(name: str, ttl_seconds: int) -> bool:
+    """
+    Try to take (or renew) the named lease for ttl_seconds.
+    Returns True if this worker now holds the lease, False if another live holder has it.
+    """
+    db = await get_database()
+    now = datetime.now(timezone.utc)
+
+    try:
+        lease = await db.recruitment_portal.leases.find_one_and_update(
+            {
+                "_id": name,
+                "$or": [
+                    {"expires_at": {"$lte": now}},
+                    {"holder": LEASE_HOLDER_ID}
+                ]
+            },
+            {"$set": {
+                "holder": LEASE_HOLDER_ID,
+                "acquired_at": now,
+                "expires_at": now + timedelta(seconds=ttl_seconds)
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # The lease document exists and is held by someone else, so the upsert collided
+        return False
+
+    return lease is not None and lease.get("holder") == LEASE_HOLDER_ID
+
+async def release_lease(name: str):
+    """Release the named lease if this worker holds it."""
+    db = await get_database()
+    await db.recruitment_portal.leases.update_one(
+        {"_id": name, "holder": LEASE_HOLDER_ID},
+        {"$set": {"expires_at": datetime.now(timezone.utc)}}
+    )
@@ -0,0 +1,49 @@
+from typing import Optional, Tuple
+from job_fields import day_range, report_date_range
+from search import search_filter
+
+# Mongo filters shared by the admin list endpoints and the bulk exports
+
+async def job_filter(collection, status: Optional[str] = None, assigned_hr: Optional[str] = None,
+                     report_type: Optional[str] = None, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None, search: Optional[str] = None) -> Tuple[dict, bool]:
+    """Filter for the jobs list, and whether the search should be ranked by text score."""
+    filter_query = {}
+    if status:
+        filter_query["status"] = status
+    if assigned_hr:
+        filter_query["assigned_hr"] = assigned_hr
+
+    # Handle search functionality
+    search_query, ranked = await search_filter(collection, search)
+    filter_query.update(search_query)
+
+    # Handle date filtering on the start_date datetime
+    if report_type:
+        start_date_range = report_date_range(report_type)
+    else:
+        # Custom date range - filter jobs with start_date between start and end days (inclusive)
+        start_date_range = day_range(start_date, end_date)
+    if start_date_range:
+        filter_query["start_date"] = start_date_range
+
+    return filter_query, ranked
+
+async def job_history_filter(collection, search: Optional[str] = None) -> Tuple[dict, bool]:
+    """Filter for the job history list, and whether the search should be ranked by text score."""
+    return await search_filter(collection, search)
+
+def candidate_filter(status: Optional[str] = None, hr_id: Optional[str] = None, job_id: Optional[str] = None,
+                     start_date: Optional[str] = None, end_date: Optional[str] = None) -> dict:
+    """Filter for the candidates list: status, creating HR, job and created_at day range."""
+    filter_query = {}
+    if status:
+        filter_query["status"] = status
+    if hr_id:
+        filter_query["created_by"] = hr_id
+    if job_id:
+        filter_query["job_id"] = job_id
+    created_at_range = day_range(start_date, end_date)
+    if created_at_range:
+        filter_query["created_at"] = created_at_range
+    return filter_query
@@ -1,13 +1,20 @@
-import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database import connect_to_mongo, close_mongo_connection
 from error_handlers import register_exception_handlers
-from routes import auth, admin, hr, shared
-from routes.shared import update_expired_job_statuses
+from routes import auth, admin, hr, shared, export, metrics as metrics_routes
+from job_expiry import run_expiry_sweep
+from scheduler import scheduler
+from dashboard_counters import ensure_dashboard_counters
+from indexes import ensure_indexes
+from password_hashing import password_hasher
 from config import settings
+from responses import BSONJSONResponse
+from metrics import MetricsMiddleware, flush_metrics
+from slow_queries import slow_query_listener, ensure_slow_query_collection
+from database import get_database
 
-app = FastAPI(title="Recruitment Portal API", version="1.0.0")
+app = FastAPI(title="Recruitment Portal API", version="1.0.0", default_response_class=BSONJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -18,6 +25,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request count and latency per route template; also tags Mongo commands with their route
+if settings.METRICS_ENABLED or settings.SLOW_QUERY_LOG_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Register exception handlers
 register_exception_handlers(app)
 
@@ -26,31 +37,46 @@ app.include_router(auth.router)
 app.include_router(admin.router)
 app.include_router(hr.router)
 app.include_router(shared.router)
+app.include_router(export.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_routes.router)
+
+# Periodic maintenance jobs
+scheduler.register(
+    "job_expiry_sweep", run_expiry_sweep,
+    interval_seconds=settings.JOB_STATUS_CHECK_INTERVAL,
+    jitter_seconds=settings.JOB_STATUS_CHECK_JITTER_SECONDS
+)
+# Share this worker's metrics with the others through METRICS_DIR; the first run, at
+# startup, also compacts the files of workers that have exited
+if settings.METRICS_ENABLED and settings.METRICS_DIR:
+    scheduler.register("metrics_flush", flush_metrics, interval_seconds=settings.METRICS_FLUSH_SECONDS)
 
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
-    # Start background task for checking expired jobs
-    asyncio.create_task(periodic_job_status_check())
+    # The capped slow query collection must exist before anything can be logged into it
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        client = await get_database()
+        await ensure_slow_query_collection(client.recruitment_portal)
+    # Create any missing indexes in the background
+    if settings.ENSURE_INDEXES_ON_STARTUP:
+        scheduler.spawn("ensure_indexes", ensure_indexes())
+    # Build the dashboard counters on first deployment
+    scheduler.spawn("ensure_dashboard_counters", ensure_dashboard_counters())
+    # Start the periodic jobs (the expiry sweep runs at startup, then every interval)
+    scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Stop background work before the connection it uses goes away
+    await scheduler.shutdown()
+    await slow_query_listener.drain(timeout=settings.SCHEDULER_SHUTDOWN_TIMEOUT_SECONDS)
+    # Keep this worker's final counts in the shared totals
+    if settings.METRICS_ENABLED and settings.METRICS_DIR:
+        await flush_metrics()
     await close_mongo_connection()
-
-async def periodic_job_status_check():
-    """
-    Background task that runs every hour to check and update expired job statuses.
-    """
-    while True:
-        try:
-            # Check for expired jobs based on configuration
-            await asyncio.sleep(settings.JOB_STATUS_CHECK_INTERVAL)
-            await update_expired_job_statuses()
-            print("Background task: Checked and updated expired job statuses")
-        except Exception as e:
-            print(f"Background task error: {e}")
-            # Continue running even if there's an error
-            continue
+    password_hasher.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,509 @@
+import asyncio
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+from pymongo import monitoring
+from config import settings
+
+# Request and Mongo command latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Metric:
+    """
+    One metric family; samples are keyed by their label values.
+    Updates may come from pymongo's monitoring threads, so they go through a lock.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.samples: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence) -> Tuple[str, ...]:
+        return tuple(str(value) for value in labels)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def set_total(self, *labels, value: float):
+        """Mirror a running total kept elsewhere (e.g. scheduler or password hasher stats)."""
+        with self._lock:
+            self.samples[self._key(labels)] = value
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self.samples[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value: float):
+        key = self._key(labels)
+        # Per-bucket (non-cumulative) counts plus a final +Inf slot, then sum
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def collector(self, func):
+        """Register a function that refreshes mirrored metrics right before they are read."""
+        self.collectors.append(func)
+        return func
+
+    def collect(self):
+        for func in self.collectors:
+            try:
+                func()
+            except Exception as e:
+                print(f"Metrics collector {func.__name__} failed: {e}")
+
+    def state(self) -> dict:
+        """JSON-friendly copy of every sample, as written to the shared metrics directory."""
+        self.collect()
+        state = {}
+        for metric in self.metrics.values():
+            with metric._lock:
+                samples = [[list(key), value] for key, value in metric.samples.items()]
+            state[metric.name] = samples
+        return state
+
+registry = Registry()
+
+# HTTP
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled, by route template and status", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency, by route template and status", ("method", "route", "status")
+))
+
+# MongoDB commands
+mongo_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency as seen by the driver", ("collection", "command")
+))
+mongo_command_failures = registry.register(Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error", ("collection", "command")
+))
+
+# MongoDB connection pool
+mongo_pool_connections = registry.register(Gauge(
+    "mongodb_pool_connections", "Open connections in the driver pool", ("address",)
+))
+mongo_pool_checked_out = registry.register(Gauge(
+    "mongodb_pool_checked_out_connections", "Connections currently checked out of the pool", ("address",)
+))
+mongo_pool_checkout_failures = registry.register(Counter(
+    "mongodb_pool_checkout_failures_total", "Failed connection checkouts, by reason", ("address", "reason")
+))
+mongo_pool_clears = registry.register(Counter(
+    "mongodb_pool_cleared_total", "Times the driver cleared a connection pool", ("address",)
+))
+
+# Scheduled jobs
+scheduler_runs = registry.register(Counter("scheduler_job_runs_total", "Completed scheduled job runs", ("job",)))
+scheduler_failures = registry.register(Counter("scheduler_job_failures_total", "Scheduled job runs that raised", ("job",)))
+scheduler_skipped = registry.register(Counter(
+    "scheduler_job_skipped_overlaps_total", "Scheduled job runs skipped because the previous run was still going", ("job",)
+))
+scheduler_duration = registry.register(Counter(
+    "scheduler_job_duration_seconds_total", "Total time spent in scheduled job runs", ("job",)
+))
+scheduler_running = registry.register(Gauge("scheduler_job_running", "1 while a scheduled job is running", ("job",)))
+
+# Password hashing
+password_hash_operations = registry.register(Counter(
+    "password_hash_operations_total", "bcrypt hash and verify calls", ("operation",)
+))
+password_hash_seconds = registry.register(Counter(
+    "password_hash_seconds_total", "Time spent in bcrypt", ("operation",)
+))
+password_hash_queue_wait = registry.register(Counter(
+    "password_hash_queue_wait_seconds_total", "Time spent waiting for a hashing thread", ("operation",)
+))
+password_hash_rejected = registry.register(Counter(
+    "password_hash_rejected_total", "Hashing requests rejected because the queue was full"
+))
+password_hash_in_flight = registry.register(Gauge("password_hash_in_flight", "Hashing requests queued or running"))
+
+@registry.collector
+def collect_scheduler():
+    from scheduler import scheduler
+    for name, job in scheduler.snapshot()["jobs"].items():
+        scheduler_runs.set_total(name, value=job["runs"])
+        scheduler_failures.set_total(name, value=job["failures"])
+        scheduler_skipped.set_total(name, value=job["skipped_overlaps"])
+        scheduler_duration.set_total(name, value=job["total_duration_seconds"])
+        scheduler_running.set(name, value=int(job["running"]))
+
+@registry.collector
+def collect_password_hasher():
+    from password_hashing import password_hasher
+    snapshot = password_hasher.snapshot()
+    for operation, op_stats in snapshot["operations"].items():
+        password_hash_operations.set_total(operation, value=op_stats["count"])
+        password_hash_seconds.set_total(operation, value=op_stats["total_hash_seconds"])
+        password_hash_queue_wait.set_total(operation, value=op_stats["total_queue_wait_seconds"])
+    password_hash_rejected.set_total(value=snapshot["rejected"])
+    password_hash_in_flight.set(value=snapshot["in_flight"])
+
+def _command_collection(command_name: str, command) -> str:
+    target = command.get(command_name)
+    if isinstance(target, str):
+        return target
+    # getMore and killCursors carry the cursor id first and the collection separately
+    return command.get("collection") or command.get("killCursors") or "none"
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Times every command by collection and command name (the collection is only on the started event)."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = _command_collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event) -> str:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), "none")
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        mongo_command_duration.observe(collection, event.command_name, value=event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongo_command_duration.observe(collection, event.command_name, value=event.duration_micros / 1e6)
+        mongo_command_failures.inc(collection, event.command_name)
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Keeps open and checked-out connection gauges per server address."""
+
+    def pool_created(self, event):
+        mongo_pool_connections.set(_address(event), value=0)
+        mongo_pool_checked_out.set(_address(event), value=0)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        mongo_pool_clears.inc(_address(event))
+
+    def pool_closed(self, event):
+        mongo_pool_connections.set(_address(event), value=0)
+        mongo_pool_checked_out.set(_address(event), value=0)
+
+    def connection_created(self, event):
+        mongo_pool_connections.inc(_address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        mongo_pool_connections.dec(_address(event))
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        mongo_pool_checkout_failures.inc(_address(event), event.reason)
+
+    def connection_checked_out(self, event):
+        mongo_pool_checked_out.inc(_address(event))
+
+    def connection_checked_in(self, event):
+        mongo_pool_checked_out.dec(_address(event))
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+def event_listeners() -> list:
+    """Listeners to pass to the Mongo client."""
+    return [CommandMetricsListener(), PoolMetricsListener()]
+
+# What the current task is working for: the ASGI scope of a request (whose endpoint the
+# router fills in) or the name of a background job. Motor copies the context into its
+# executor threads, so command listeners can attribute commands to a route.
+current_origin: ContextVar = ContextVar("current_origin", default=None)
+
+_route_templates: Dict[object, str] = {}
+
+def route_template(scope) -> str:
+    """The matched route's path template (e.g. /admin/jobs/{job_id}), or "unmatched"."""
+    if not _route_templates:
+        _route_templates.update({
+            route.endpoint: route.path
+            for route in scope["app"].routes if getattr(route, "endpoint", None)
+        })
+    return _route_templates.get(scope.get("endpoint"), "unmatched")
+
+def origin_label() -> Optional[str]:
+    origin = current_origin.get()
+    if isinstance(origin, dict):
+        return f"{origin['method']} {route_template(origin)}"
+    return origin
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count and latency per route template
+    (e.g. /admin/jobs/{job_id}) so that path parameters do not explode the label set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+        token = current_origin.set(scope)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_origin.reset(token)
+            labels = (scope["method"], route_template(scope), status_code)
+            http_requests.inc(*labels)
+            http_request_duration.observe(*labels, value=time.perf_counter() - started)
+
+# Multi-worker aggregation: with METRICS_DIR set, each worker writes its samples to
+# <METRICS_DIR>/<pid>-<random>.json and /metrics serves the sum over all workers. The random
+# part keeps a respawned worker that reuses a pid from overwriting its predecessor's file.
+# Files of workers that have exited (or stopped writing for METRICS_DEAD_AFTER_FLUSHES
+# intervals) are folded into compacted.json, so counters and histograms never go backwards
+# and the directory does not grow; gauges are reported per live worker only.
+
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+COMPACTED_FILE = "compacted.json"
+LOCK_FILE = ".lock"
+METRICS_DEAD_AFTER_FLUSHES = 10
+
+@contextmanager
+def _locked(exclusive: bool):
+    """Serialize compaction against readers and other workers' compactions."""
+    with open(os.path.join(settings.METRICS_DIR, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _write_json(path: str, state: dict):
+    tmp_path = f"{path}.{WORKER_ID}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _worker_files() -> list:
+    return [
+        path for path in glob.glob(os.path.join(settings.METRICS_DIR, "*.json"))
+        if os.path.basename(path) != COMPACTED_FILE
+    ]
+
+def _worker_id(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+def _is_dead(path: str) -> bool:
+    worker_id = _worker_id(path)
+    if worker_id == WORKER_ID:
+        return False
+    try:
+        if os.path.getmtime(path) < time.time() - METRICS_DEAD_AFTER_FLUSHES * settings.METRICS_FLUSH_SECONDS:
+            return True
+    except OSError:
+        return False
+    try:
+        os.kill(int(worker_id.split("-")[0]), 0)
+    except ProcessLookupError:
+        return True
+    except (OSError, ValueError):
+        # Exists but not ours to signal, or not a worker file name
+        pass
+    return False
+
+def compact():
+    """Fold the samples of exited workers into compacted.json and remove their files."""
+    with _locked(exclusive=True):
+        dead = [path for path in _worker_files() if _is_dead(path)]
+        if not dead:
+            return
+        states = [("compacted", _read_json(os.path.join(settings.METRICS_DIR, COMPACTED_FILE)) or {}, False)]
+        states += [(_worker_id(path), _read_json(path) or {}, False) for path in dead]
+        merged = _merge(states)
+        _write_json(os.path.join(settings.METRICS_DIR, COMPACTED_FILE), {
+            name: [[list(key), value] for key, value in samples.items()]
+            for name, samples in merged.items()
+            if registry.metrics[name].kind != "gauge"
+        })
+        for path in dead:
+            os.remove(path)
+
+def flush(state: dict):
+    """Write this worker's samples (a registry.state() snapshot) to the shared metrics directory."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    _write_json(os.path.join(settings.METRICS_DIR, f"{WORKER_ID}.json"), state)
+
+def _flush_and_compact(state: dict):
+    flush(state)
+    compact()
+
+def _flush_and_load(state: dict) -> list:
+    flush(state)
+    return _load_states()
+
+async def flush_metrics():
+    """
+    Publish this worker's samples and compact exited workers' files (no-op without METRICS_DIR).
+    The samples are snapshotted on the event loop, where the collectors' sources live; the file
+    IO and locking run in a worker thread.
+    """
+    if not settings.METRICS_DIR:
+        return
+    state = registry.state()
+    await asyncio.to_thread(_flush_and_compact, state)
+
+def _load_states() -> list:
+    """(worker id, state, fresh) for the compacted totals and every worker that has written its samples."""
+    stale_before = time.time() - 3 * settings.METRICS_FLUSH_SECONDS
+    states = []
+    with _locked(exclusive=False):
+        compacted = _read_json(os.path.join(settings.METRICS_DIR, COMPACTED_FILE))
+        if compacted:
+            states.append(("compacted", compacted, False))
+        for path in _worker_files():
+            state = _read_json(path)
+            if state is None:
+                continue
+            try:
+                fresh = os.path.getmtime(path) >= stale_before
+            except OSError:
+                continue
+            states.append((_worker_id(path), state, fresh))
+    return states
+
+def _merge(states: list) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {name: {} for name in registry.metrics}
+    for worker_id, state, fresh in states:
+        for name, samples in state.items():
+            metric = registry.metrics.get(name)
+            if metric is None:
+                continue
+            for key, value in samples:
+                if metric.kind == "gauge":
+                    if fresh:
+                        merged[name][tuple(key) + (worker_id,)] = value
+                elif metric.kind == "histogram":
+                    current = merged[name].get(tuple(key))
+                    merged[name][tuple(key)] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    merged[name][tuple(key)] = merged[name].get(tuple(key), 0) + value
+    return merged
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+async def render() -> str:
+    """Prometheus text exposition of this worker's metrics, or of all workers with METRICS_DIR set."""
+    if settings.METRICS_DIR:
+        state = registry.state()
+        samples_by_name = _merge(await asyncio.to_thread(_flush_and_load, state))
+    else:
+        registry.collect()
+        samples_by_name = {}
+        for metric in registry.metrics.values():
+            with metric._lock:
+                samples_by_name[metric.name] = {key: list(value) if isinstance(value, list) else value
+                                                for key, value in metric.samples.items()}
+
+    lines = []
+    for metric in registry.metrics.values():
+        label_names = metric.labels
+        if metric.kind == "gauge" and settings.METRICS_DIR:
+            label_names = label_names + ("worker",)
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(samples_by_name.get(metric.name, {}).items()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(label_names, key)} {_format(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _labels(label_names, key, 'le="' + le + '"')
+                lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(label_names, key)} {_format(value[-1])}")
+            lines.append(f"{metric.name}_count{_labels(label_names, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+import asyncio
+import sys
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from pymongo import UpdateOne
+from database import get_database, connect_to_mongo, close_mongo_connection
+from job_fields import MONEY_FIELDS, to_number, InvalidNumber, DATE_FIELDS, to_utc_datetime, InvalidDate
+from search import ID_FIELDS, set_search_fields
+
+DEFAULT_BATCH_SIZE = 500
+
+class Migration:
+    """
+    A batched, resumable document migration.
+    `query` selects the documents still needing conversion and `transform` returns the
+    fields to $set for one document (or None to leave it as is).
+    """
+
+    def __init__(self, name: str, collections: list, query: dict, projection: dict,
+                 transform: Callable[[dict], Optional[dict]]):
+        self.name = name
+        self.collections = collections
+        self.query = query
+        self.projection = projection
+        self.transform = transform
+
+async def run_migration(migration: Migration, batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False) -> dict:
+    """
+    Walk each collection in _id order, converting one batch per bulk write.
+    Progress is checkpointed in maintenance_state after every batch, so an interrupted run
+    resumes where it stopped.
+    """
+    db = await get_database()
+    state = db.recruitment_portal.maintenance_state
+    summary = {}
+
+    for collection_name in migration.collections:
+        collection = db.recruitment_portal[collection_name]
+        checkpoint_id = f"migration:{migration.name}:{collection_name}"
+
+        checkpoint = None if restart else await state.find_one({"_id": checkpoint_id})
+        if checkpoint and checkpoint.get("completed_at"):
+            print(f"{migration.name} on {collection_name}: already completed")
+            continue
+
+        last_id = checkpoint.get("last_id") if checkpoint else None
+        scanned = checkpoint.get("scanned", 0) if checkpoint else 0
+        converted = checkpoint.get("converted", 0) if checkpoint else 0
+
+        while True:
+            query = dict(migration.query)
+            if last_id is not None:
+                query = {"$and": [migration.query, {"_id": {"$gt": last_id}}]}
+            batch = await collection.find(query, migration.projection).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not batch:
+                break
+
+            operations = []
+            for doc in batch:
+                changes = migration.transform(doc)
+                if changes:
+                    operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if operations:
+                result = await collection.bulk_write(operations, ordered=False)
+                converted += result.modified_count
+
+            scanned += len(batch)
+            last_id = batch[-1]["_id"]
+            await state.update_one(
+                {"_id": checkpoint_id},
+                {"$set": {"last_id": last_id, "scanned": scanned, "converted": converted}, "$unset": {"completed_at": ""}},
+                upsert=True
+            )
+            print(f"{migration.name} on {collection_name}: scanned {scanned}, converted {converted}")
+
+        await state.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"completed_at": datetime.now(timezone.utc), "scanned": scanned, "converted": converted}},
+            upsert=True
+        )
+        summary[collection_name] = {"scanned": scanned, "converted": converted}
+
+    return summary
+
+def _convert_money_fields(doc: dict) -> Optional[dict]:
+    changes = {}
+    for field in MONEY_FIELDS:
+        if isinstance(doc.get(field), str):
+            try:
+                changes[field] = to_number(doc[field])
+            except InvalidNumber:
+                # Leave values that are not numbers for manual cleanup
+                print(f"  {doc['_id']}: cannot convert {field}={doc[field]!r}")
+    return changes or None
+
+SALARY_FIELDS_MIGRATION = Migration(
+    name="salary_fields",
+    collections=["jobs", "job_history"],
+    query={"$or": [{field: {"$type": "string"}} for field in MONEY_FIELDS]},
+    projection={field: 1 for field in MONEY_FIELDS},
+    transform=_convert_money_fields
+)
+
+def _convert_date_fields(doc: dict) -> Optional[dict]:
+    changes = {}
+    for field in DATE_FIELDS:
+        if isinstance(doc.get(field), str):
+            try:
+                changes[field] = to_utc_datetime(doc[field])
+            except InvalidDate:
+                # Leave values that are not dates for manual cleanup
+                print(f"  {doc['_id']}: cannot convert {field}={doc[field]!r}")
+    return changes or None
+
+JOB_DATES_MIGRATION = Migration(
+    name="job_dates",
+    collections=["jobs", "job_history"],
+    query={"$or": [{field: {"$type": "string"}} for field in DATE_FIELDS]},
+    projection={field: 1 for field in DATE_FIELDS},
+    transform=_convert_date_fields
+)
+
+def _add_search_prefixes(doc: dict) -> Optional[dict]:
+    return {"search_prefixes": set_search_fields(dict(doc))["search_prefixes"]}
+
+SEARCH_PREFIXES_MIGRATION = Migration(
+    name="search_prefixes",
+    collections=["jobs", "job_history"],
+    query={"search_prefixes": {"$exists": False}},
+    projection={field: 1 for field in ID_FIELDS},
+    transform=_add_search_prefixes
+)
+
+MIGRATIONS = {
+    SALARY_FIELDS_MIGRATION.name: SALARY_FIELDS_MIGRATION,
+    JOB_DATES_MIGRATION.name: JOB_DATES_MIGRATION,
+    SEARCH_PREFIXES_MIGRATION.name: SEARCH_PREFIXES_MIGRATION
+}
+
+async def main(args: list):
+    if not args or args[0] not in MIGRATIONS:
+        print(f"Usage: python migrations.py [{'|'.join(MIGRATIONS)}] [--restart]")
+        return
+
+    await connect_to_mongo()
+    try:
+        summary = await run_migration(MIGRATIONS[args[0]], restart="--restart" in args)
+        print(f"Migration {args[0]} finished: {summary}")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
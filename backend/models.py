@@ -18,7 +18,7 @@ class JobBase(BaseModel):
     title: str
     description: str
     location: str
-    salary_package: str
+    salary_package: Optional[float] = None
     source_company: str
     csa_id: str  # 6 character alphanumeric
     start_date: datetime
@@ -26,8 +26,8 @@ class JobBase(BaseModel):
     # New fields for salary band system
     salary_band: Optional[str] = None
     salary_rate: Optional[str] = None  # standard, ra1, ra2
-    profit_percentage: Optional[str] = None
-    expected_package: Optional[str] = None
+    profit_percentage: Optional[float] = None
+    expected_package: Optional[float] = None
     priority: Optional[str] = None  # low, medium, high
 
 class JobCreate(JobBase):
@@ -0,0 +1,146 @@
+import base64
+import binascii
+from typing import Optional, Tuple
+from bson import json_util
+from bson.errors import BSONError
+from fastapi import HTTPException
+from config import settings
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+def encode_cursor(sort_field: str, doc: dict) -> str:
+    """Opaque cursor pointing just after `doc` in (sort_field desc, _id desc) order."""
+    payload = json_util.dumps({"f": sort_field, "v": doc.get(sort_field), "id": doc["_id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(sort_field: str, cursor: str) -> dict:
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError, IndexError,
+            OverflowError, BSONError):
+        # json_util raises all of these on malformed {"$oid": ...} / {"$date": ...} values
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (not isinstance(payload, dict) or payload.get("f") != sort_field
+            or "v" not in payload or "id" not in payload):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload
+
+def cursor_filter(sort_field: str, cursor: Optional[str]) -> dict:
+    """
+    Match the documents after the cursor in (sort_field desc, _id desc) order.
+    An empty cursor means the first page.
+    """
+    if not cursor:
+        return {}
+    position = decode_cursor(sort_field, cursor)
+    return {"$or": [
+        {sort_field: {"$lt": position["v"]}},
+        {sort_field: position["v"], "_id": {"$lt": position["id"]}}
+    ]}
+
+def keyset_sort(sort_field: str) -> list:
+    return [(sort_field, -1), ("_id", -1)]
+
+def validate_count_mode(count: Optional[str], default: str) -> str:
+    count = count or default
+    if count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count must be one of: {', '.join(COUNT_MODES)}")
+    return count
+
+async def count_matching(collection, filter_query: dict, count: str) -> Tuple[Optional[int], bool]:
+    """
+    Total for a list filter, and whether it is an estimate.
+    "estimate" stops counting at PAGINATION_COUNT_LIMIT (and uses collection metadata when
+    there is no filter), so its cost does not grow with the collection.
+    """
+    if count == "none":
+        return None, False
+    if count == "estimate":
+        if not filter_query:
+            return await collection.estimated_document_count(), True
+        cap = settings.PAGINATION_COUNT_LIMIT
+        total = await collection.count_documents(filter_query, limit=cap)
+        return total, total >= cap
+    return await collection.count_documents(filter_query), False
+
+def _page_pagination(page: int, limit: int, docs: list, total: Optional[int], is_estimate: bool, total_key: str) -> dict:
+    pagination = {
+        "page": page,
+        "limit": limit,
+        total_key: total,
+        "total_pages": (total + limit - 1) // limit if total is not None else None,
+        "has_next": len(docs) > limit,
+        "has_prev": page > 1
+    }
+    if is_estimate:
+        pagination["total_is_estimate"] = True
+    return pagination
+
+def _cursor_pagination(sort_field: str, limit: int, docs: list, total: Optional[int], is_estimate: bool, total_key: str) -> dict:
+    has_next = len(docs) > limit
+    pagination = {
+        "limit": limit,
+        "has_next": has_next,
+        "next_cursor": encode_cursor(sort_field, docs[limit - 1]) if has_next else None
+    }
+    if total is not None:
+        pagination[total_key] = total
+        pagination["total_is_estimate"] = is_estimate
+    return pagination
+
+def _with_cursor(filter_query: dict, sort_field: str, cursor: str) -> dict:
+    position = cursor_filter(sort_field, cursor)
+    if not position:
+        return filter_query
+    return {"$and": [filter_query, position]} if filter_query else position
+
+async def find_page(collection, filter_query: dict, sort_field: str, *, page: int, limit: int,
+                    cursor: Optional[str] = None, count: Optional[str] = None,
+                    projection: Optional[dict] = None, sort_prefix: Optional[list] = None,
+                    total_key: str = "total") -> Tuple[list, dict]:
+    """
+    Fetch one page of a list endpoint, newest first with _id as the tie-breaker.
+
+    Without a cursor this is the original page/limit mode (skip-based, exact total by default).
+    When `cursor` is passed (empty for the first page) it switches to keyset mode: the page
+    starts after the cursor position, the response carries `next_cursor`, and the total is
+    only computed when asked for, so a deep page costs the same as the first one.
+    `sort_prefix` (e.g. relevance) only applies to page/limit mode.
+    """
+    if cursor is None:
+        count = validate_count_mode(count, "exact")
+        sort = (sort_prefix or []) + keyset_sort(sort_field)
+        skip = (page - 1) * limit
+        docs = await collection.find(filter_query, projection).sort(sort).skip(skip).limit(limit + 1).to_list(length=limit + 1)
+        total, is_estimate = await count_matching(collection, filter_query, count)
+        return docs[:limit], _page_pagination(page, limit, docs, total, is_estimate, total_key)
+
+    count = validate_count_mode(count, "none")
+    page_query = _with_cursor(filter_query, sort_field, cursor)
+    docs = await collection.find(page_query, projection).sort(keyset_sort(sort_field)).limit(limit + 1).to_list(length=limit + 1)
+    total, is_estimate = await count_matching(collection, filter_query, count)
+    return docs[:limit], _cursor_pagination(sort_field, limit, docs, total, is_estimate, total_key)
+
+async def aggregate_page(collection, filter_query: dict, sort_field: str, *, page: int, limit: int,
+                         cursor: Optional[str] = None, count: Optional[str] = None,
+                         stages: Optional[list] = None, total_key: str = "total") -> Tuple[list, dict]:
+    """
+    Same paging rules as find_page, for lists that need enrichment: `stages` (lookups,
+    projections) run after the page has been cut, so they only touch `limit` documents.
+    """
+    if cursor is None:
+        count = validate_count_mode(count, "exact")
+        match = filter_query
+        window = [{"$skip": (page - 1) * limit}]
+    else:
+        count = validate_count_mode(count, "none")
+        match = _with_cursor(filter_query, sort_field, cursor)
+        window = []
+
+    pipeline = [{"$match": match}, {"$sort": dict(keyset_sort(sort_field))}] + window + [{"$limit": limit + 1}] + (stages or [])
+    docs = await collection.aggregate(pipeline).to_list(length=limit + 1)
+    total, is_estimate = await count_matching(collection, filter_query, count)
+
+    if cursor is None:
+        return docs[:limit], _page_pagination(page, limit, docs, total, is_estimate, total_key)
+    return docs[:limit], _cursor_pagination(sort_field, limit, docs, total, is_estimate, total_key)
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a dedicated, size-limited thread pool
+    so that a burst of logins cannot block the event loop. Requests beyond the
+    configured queue depth are rejected immediately with a 503.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._in_flight = 0
+        self.stats = {
+            "hash": self._empty_stats(),
+            "verify": self._empty_stats(),
+            "rejected": 0
+        }
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "count": 0,
+            "total_hash_seconds": 0.0,
+            "max_hash_seconds": 0.0,
+            "total_queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def _run(self, operation: str, fn, *args):
+        # Fail fast instead of letting callers pile up behind a saturated pool
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy. Please try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+
+        submitted_at = time.perf_counter()
+
+        def timed_call():
+            started_at = time.perf_counter()
+            result = fn(*args)
+            return result, started_at, time.perf_counter()
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, started_at, finished_at = await loop.run_in_executor(self._executor, timed_call)
+        finally:
+            self._in_flight -= 1
+
+        self._record(operation, started_at - submitted_at, finished_at - started_at)
+        return result
+
+    def _record(self, operation: str, queue_wait: float, hash_time: float):
+        op_stats = self.stats[operation]
+        op_stats["count"] += 1
+        op_stats["total_hash_seconds"] += hash_time
+        op_stats["max_hash_seconds"] = max(op_stats["max_hash_seconds"], hash_time)
+        op_stats["total_queue_wait_seconds"] += queue_wait
+        op_stats["max_queue_wait_seconds"] = max(op_stats["max_queue_wait_seconds"], queue_wait)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", pwd_context.verify, plain_password, hashed_password)
+
+    def snapshot(self) -> dict:
+        """Return a JSON-friendly view of the executor state and latency statistics."""
+        operations = {}
+        for operation in ("hash", "verify"):
+            op_stats = self.stats[operation]
+            count = op_stats["count"]
+            operations[operation] = {
+                **op_stats,
+                "avg_hash_seconds": op_stats["total_hash_seconds"] / count if count else 0.0,
+                "avg_queue_wait_seconds": op_stats["total_queue_wait_seconds"] / count if count else 0.0
+            }
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "rejected": self.stats["rejected"],
+            "operations": operations
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
@@ -0,0 +1,254 @@
+import csv
+import io
+import math
+import re
+import zipfile
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Sequence, Union
+from xml.sax.saxutils import escape as xml_escape
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.concurrency import run_in_threadpool
+from openpyxl.utils import get_column_letter
+from config import settings
+from responses import encode_bson
+
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Largest number of data rows an Excel sheet can hold (one row is the header)
+XLSX_MAX_ROWS = 1048575
+
+def cell_value(value, keep_datetimes: bool = False):
+    """Flatten a document value into a single spreadsheet / CSV cell."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        # The XLSX writer stores naive datetimes as Excel dates
+        return value if keep_datetimes and value.tzinfo is None else value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value, default=encode_bson).decode()
+    return value
+
+async def iter_csv(docs: AsyncIterator[dict], columns: Sequence[str], chunk_size: int = None) -> AsyncIterator[bytes]:
+    """Stream documents as CSV rows, flushing roughly every `chunk_size` bytes."""
+    chunk_size = chunk_size or settings.REPORT_STREAM_CHUNK_SIZE
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for doc in docs:
+        writer.writerow([cell_value(doc.get(column)) for column in columns])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+async def iter_ndjson(docs: AsyncIterator[dict], chunk_size: int = None) -> AsyncIterator[bytes]:
+    """Stream documents as newline-delimited JSON, flushing roughly every `chunk_size` bytes."""
+    chunk_size = chunk_size or settings.REPORT_STREAM_CHUNK_SIZE
+    lines = []
+    size = 0
+    async for doc in docs:
+        line = orjson.dumps(doc, default=encode_bson, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(lines)
+            lines = []
+            size = 0
+    yield b"".join(lines)
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable file that collects what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Style 1 is the built-in "m/d/yy h:mm" date format used for datetime cells
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+}
+
+# Characters XML 1.0 cannot carry; they are dropped
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+def _xml_text(value) -> str:
+    return xml_escape(_ILLEGAL_XML_CHARS.sub("", str(value)), {'"': "&quot;"})
+
+def _xlsx_cell(reference: str, value) -> str:
+    if value is None or value == "":
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, float) and not math.isfinite(value):
+        # Excel has no NaN or infinity and reports such cells as a corrupt file
+        if math.isnan(value):
+            return ""
+        value = str(value)
+    elif isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value!r}</v></c>'
+    if isinstance(value, datetime) and value.tzinfo is None:
+        serial = (value - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{reference}" s="1"><v>{serial!r}</v></c>'
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{_xml_text(value)}</t></is></c>'
+
+class XlsxStreamWriter:
+    """
+    Minimal single-sheet .xlsx producer that emits the zip as it is written, so a report
+    can start sending bytes before the last row is read. Rows are never kept in memory,
+    except the first `width_sample_rows`, which are held back to size the columns. Every
+    method returns the bytes produced so far; they are plain CPU work, meant to be called
+    in the threadpool.
+    """
+
+    def __init__(self, sheet_name: str, headers: Sequence[str],
+                 width_sample_rows: int = None, max_column_width: int = 50):
+        self._sink = _ZipSink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_DEFLATED)
+        self._sheet_name = sheet_name[:31]
+        self._headers = list(headers)
+        self._letters = [get_column_letter(index) for index in range(1, len(self._headers) + 1)]
+        self._widths = [len(str(header)) for header in self._headers]
+        self._width_sample_rows = width_sample_rows or settings.REPORT_WIDTH_SAMPLE_ROWS
+        self._max_column_width = max_column_width
+        self._pending_rows: List[list] = []
+        self._sheet = None
+        self._row_number = 0
+
+    def append_rows(self, rows: Sequence[Sequence]) -> bytes:
+        for row in rows:
+            if self._sheet is not None:
+                self._write_row(row)
+                continue
+            for index, value in enumerate(row[:len(self._widths)]):
+                self._widths[index] = max(self._widths[index], len("" if value is None else str(value)))
+            self._pending_rows.append(row)
+            if len(self._pending_rows) >= self._width_sample_rows:
+                self._start()
+        return self._sink.drain()
+
+    def _start(self):
+        for name, content in _XLSX_STATIC_PARTS.items():
+            self._zip.writestr(name, content)
+        self._zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{_xml_text(self._sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        cols = "".join(
+            f'<col min="{index}" max="{index}" width="{min(width + 2, self._max_column_width)}" customWidth="1"/>'
+            for index, width in enumerate(self._widths, start=1)
+        )
+        self._sheet.write((
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            + (f"<cols>{cols}</cols>" if cols else "") + "<sheetData>"
+        ).encode())
+        self._write_row(self._headers)
+        for row in self._pending_rows:
+            self._write_row(row)
+        self._pending_rows = []
+
+    def _write_row(self, row: Sequence):
+        self._row_number += 1
+        cells = "".join(
+            _xlsx_cell(f"{letter}{self._row_number}", value) for letter, value in zip(self._letters, row)
+        )
+        self._sheet.write(f'<row r="{self._row_number}">{cells}</row>'.encode())
+
+    def finish(self) -> bytes:
+        if self._sheet is None:
+            self._start()
+        self._sheet.write(b"</sheetData></worksheet>")
+        self._sheet.close()
+        self._zip.close()
+        return self._sink.drain()
+
+async def document_rows(docs: AsyncIterator[dict], columns: Sequence[str]) -> AsyncIterator[list]:
+    """Spreadsheet rows for documents, one cell per column."""
+    async for doc in docs:
+        yield [cell_value(doc.get(column), keep_datetimes=True) for column in columns]
+
+async def _as_async(rows: Iterable) -> AsyncIterator:
+    for row in rows:
+        yield row
+
+async def iter_xlsx(rows: Union[AsyncIterable, Iterable], sheet_name: str, headers: Sequence[str],
+                    batch_rows: int = None) -> AsyncIterator[bytes]:
+    """
+    Stream rows (a list or an async iterator, e.g. document_rows()) as an .xlsx file. Rows are
+    collected in batches of `batch_rows` and serialized and compressed in the threadpool, so
+    the event loop only produces the rows.
+    """
+    batch_rows = batch_rows or settings.EXPORT_BATCH_SIZE
+    if not hasattr(rows, "__aiter__"):
+        rows = _as_async(rows)
+    writer = XlsxStreamWriter(sheet_name, headers)
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            chunk = await run_in_threadpool(writer.append_rows, batch)
+            batch = []
+            if chunk:
+                yield chunk
+    chunk = await run_in_threadpool(writer.append_rows, batch)
+    yield chunk + await run_in_threadpool(writer.finish)
@@ -0,0 +1,31 @@
+from typing import Any, Iterable
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import JSONResponse
+
+def encode_bson(value: Any):
+    """orjson fallback for the BSON types it does not know (datetimes are handled natively)."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class BSONJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, encoding ObjectId, datetime and Decimal128 at any depth.
+    Handlers that return it directly skip FastAPI's jsonable_encoder pass over the content.
+    Naive datetimes keep the same format as datetime.isoformat().
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=encode_bson, option=orjson.OPT_NON_STR_KEYS)
+
+def with_id(doc: dict) -> dict:
+    """Expose a document's _id as the string `id` the frontend uses."""
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+def with_ids(docs: Iterable[dict]) -> list:
+    return [with_id(doc) for doc in docs]
@@ -2,15 +2,35 @@ from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
 from datetime import datetime, timezone, timedelta
 from bson import ObjectId
 from typing import List, Optional
-import pandas as pd
-import random
 import re
-import io
+import asyncio
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from models import UserCreate
 from routes.auth import get_current_admin_user, get_password_hash, verify_password
 from database import get_database
-from routes.shared import update_expired_job_statuses
+from user_cache import principal_cache
+from password_hashing import password_hasher
+from scheduler import scheduler
+from slow_queries import SLOW_QUERIES_COLLECTION
+from dashboard_stats import count_by_status, job_status_summary, candidate_status_summary
+from dashboard_counters import (
+    JOB_KIND, CANDIDATE_KIND, counters_ready, read_status_counts, day_key,
+    record_job_change, record_jobs_created, record_jobs_removed
+)
+from pymongo import ReturnDocument
+from job_fields import (
+    normalize_money_fields, to_number, InvalidNumber,
+    normalize_date_fields, to_utc_datetime, InvalidDate, report_date_range
+)
+from report_writer import iter_xlsx, EXCEL_MEDIA_TYPE
+from pagination import find_page, aggregate_page
+from responses import BSONJSONResponse, with_ids
+from job_import import parse_job_upload, insert_jobs
+from id_allocator import allocate_job_id, assign_job_ids
+from fieldsets import projection_for, CANDIDATE_SUMMARY_FIELDS, CANDIDATE_REQUIRED_FIELDS
+from list_filters import job_filter, job_history_filter, candidate_filter
+from search import search_sort, set_search_fields, id_prefixes, HIDE_SEARCH_FIELDS
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -27,89 +47,36 @@ async def upload_csv(file: UploadFile = File(...), current_user: dict = Depends(
         raise HTTPException(status_code=400, detail="Only CSV (.csv) and Excel (.xlsx, .xls) files are allowed")
     
     try:
-        # Read file based on extension
-        if file_extension == 'csv':
-            df = pd.read_csv(file.file)
-        else:  # Excel files
-            df = pd.read_excel(file.file, engine='openpyxl')
-        
-        # Validate required columns with flexible naming
-        required_columns = ['title', 'description', 'location', 'csa_id', 'start_date', 'end_date']
-        column_mapping = {
-            'title': ['title', 'job title', 'job_title'],
-            'description': ['description', 'job description', 'job_description'],
-            'location': ['location'],
-            'csa_id': ['csa_id', 'csa id', 'csaid'],
-            'start_date': ['start_date', 'start date', 'startdate'],
-            'end_date': ['end_date', 'end date', 'enddate']
-        }
-        
-        # Map actual columns to required columns
-        actual_columns = [col.lower().strip() for col in df.columns]
-        mapped_columns = {}
-        missing_columns = []
-        
-        for required_col, possible_names in column_mapping.items():
-            found = False
-            for possible_name in possible_names:
-                if possible_name in actual_columns:
-                    mapped_columns[required_col] = df.columns[actual_columns.index(possible_name)]
-                    found = True
-                    break
-            if not found:
-                missing_columns.append(required_col)
-        
-        if missing_columns:
-            raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
-        
-        jobs_added = 0
-        for _, row in df.iterrows():
-            # Generate unique job ID
-            job_id = f"jb{datetime.now().strftime('%m%d%H%M')}{random.randint(10, 99)}"
-            
-            # Parse dates from file
-            start_date_str = str(row[mapped_columns['start_date']]) if pd.notna(row[mapped_columns['start_date']]) else None
-            end_date_str = str(row[mapped_columns['end_date']]) if pd.notna(row[mapped_columns['end_date']]) else None
-            
-            try:
-                start_date = pd.to_datetime(start_date_str).replace(tzinfo=timezone.utc) if start_date_str else datetime.now(timezone.utc)
-                end_date = pd.to_datetime(end_date_str).replace(tzinfo=timezone.utc) if end_date_str else datetime.now(timezone.utc)
-            except:
-                start_date = datetime.now(timezone.utc)
-                end_date = datetime.now(timezone.utc)
-            
-            # Clean and validate CSA ID
-            csa_id = str(row[mapped_columns['csa_id']]).strip() if pd.notna(row[mapped_columns['csa_id']]) else ""
-            
-            job_data = {
-                "job_id": job_id,
-                "title": str(row[mapped_columns['title']]).strip() if pd.notna(row[mapped_columns['title']]) else "",
-                "description": str(row[mapped_columns['description']]).strip() if pd.notna(row[mapped_columns['description']]) else "",
-                "location": str(row[mapped_columns['location']]).strip() if pd.notna(row[mapped_columns['location']]) else "",
-                "csa_id": csa_id,
-                "start_date": start_date,
-                "end_date": end_date,
-                "salary_package": "",  # No longer required in new format
-                "source_company": f"{file_extension.upper()} Upload",
-                "uploaded_by": str(current_user["_id"]),
-                "status": "open",
-                "created_at": datetime.now(timezone.utc)
-            }
-            
-            result = await db.recruitment_portal.jobs.insert_one(job_data)
-            jobs_added += 1
-        
-        return {"message": f"Successfully uploaded {jobs_added} jobs from {file_extension.upper()} file"}
-        
+        # Parse, map and validate the sheet column by column off the event loop
+        documents, skipped_rows = await run_in_threadpool(
+            parse_job_upload, file.file, file_extension, str(current_user["_id"])
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing {file_extension.upper()} file: {str(e)}")
+    
+    rows = [doc.pop("_row") for doc in documents]
+    await assign_job_ids(documents)
+    added_jobs, failures = await insert_jobs(db.recruitment_portal.jobs, documents)
+    skipped_rows.extend({"row_index": rows[index], "reasons": [reason]} for index, reason in failures.items())
+    skipped_rows.sort(key=lambda skipped: skipped["row_index"])
+    
+    await record_jobs_created(added_jobs)
+    
+    return {
+        "message": f"Successfully uploaded {len(added_jobs)} jobs from {file_extension.upper()} file",
+        "added_count": len(added_jobs),
+        "skipped_count": len(skipped_rows),
+        "skipped_rows": skipped_rows
+    }
 
 @router.post("/add-job")
 async def add_job(job_data: dict, current_user: dict = Depends(get_current_admin_user)):
     db = await get_database()
     
-    # Generate unique job ID
-    job_id = f"jb{datetime.now().strftime('%m%d%H%M')}{random.randint(10, 99)}"
+    # Allocate a unique job ID
+    job_id = await allocate_job_id()
     
     job_data["job_id"] = job_id
     job_data["uploaded_by"] = str(current_user["_id"])
@@ -120,14 +87,18 @@ async def add_job(job_data: dict, current_user: dict = Depends(get_current_admin
     job_data["status"] = status
     job_data["created_at"] = datetime.now(timezone.utc)
     job_data["source_company"] = "Manual Entry"
+    normalize_money_fields(job_data)
     
     # Set default dates if not provided
     if "start_date" not in job_data:
         job_data["start_date"] = datetime.now(timezone.utc)
     if "end_date" not in job_data:
         job_data["end_date"] = datetime.now(timezone.utc)
+    normalize_date_fields(job_data)
+    set_search_fields(job_data)
     
     result = await db.recruitment_portal.jobs.insert_one(job_data)
+    await record_job_change(None, job_data)
     
     return {"message": "Job added successfully", "job_id": job_id}
 
@@ -135,8 +106,9 @@ async def add_job(job_data: dict, current_user: dict = Depends(get_current_admin
 async def add_jobs_bulk(jobs_data: List[dict], current_user: dict = Depends(get_current_admin_user)):
     db = await get_database()
 
-    added_count = 0
     skipped_rows = []
+    job_docs = []
+    job_rows = []
 
     # Preload HR users (for username lookup, case-insensitive)
     hr_users = await db.recruitment_portal.users.find({"role": "hr"}, {"name": 1}).to_list(length=500)
@@ -145,37 +117,46 @@ async def add_jobs_bulk(jobs_data: List[dict], current_user: dict = Depends(get_
     # Track CSA IDs within batch to enforce uniqueness per request
     seen_csa_ids = set()
 
-    # Load salary bands for band->rate lookup
+    # Load salary bands and precompute the annual amount for every band/rate pair
     salary_bands = await db.recruitment_portal.salary_bands.find({}).to_list(length=100)
-    band_map = {b["band"]: b for b in salary_bands}
+    band_amounts = {
+        (b["band"], rate_key): float(b[rate_key] * 1920)
+        for b in salary_bands
+        for rate_key in ("standard", "ra1", "ra2")
+        if b.get(rate_key) is not None
+    }
 
-    async def is_csa_unique(csa_id: str) -> bool:
-        existing = await db.recruitment_portal.jobs.find_one({"csa_id": csa_id})
-        return existing is None
+    # Fetch every CSA ID in the batch that already exists, in one query
+    batch_csa_ids = list({str(raw.get("csa_id", "")).strip() for raw in jobs_data} - {""})
+    existing_csa_ids = set()
+    if batch_csa_ids:
+        existing = await db.recruitment_portal.jobs.find(
+            {"csa_id": {"$in": batch_csa_ids}}, {"_id": 0, "csa_id": 1}
+        ).to_list(length=None)
+        existing_csa_ids = {job["csa_id"] for job in existing}
 
-    def compute_actual(band: str, rate: str) -> str:
+    def compute_actual(band: str, rate: str) -> Optional[float]:
         if not band or not rate:
-            return ""
-        band_doc = band_map.get(band)
-        if not band_doc:
-            return ""
-        rate_key = rate.lower()
-        if rate_key not in ("standard", "ra1", "ra2"):
-            return ""
-        rate_value = band_doc.get(rate_key)
-        if rate_value is None:
-            return ""
-        return str(rate_value * 1920)
+            return None
+        return band_amounts.get((band, rate.lower()))
 
-    def compute_expected(actual: str, profit: str) -> str:
+    def compute_expected(actual: Optional[float], profit: Optional[float]) -> Optional[float]:
+        if actual is None or profit is None:
+            return None
+        return actual - (actual * (profit / 100.0))
+
+    def parse_number(field: str, value, reasons: list) -> Optional[float]:
+        try:
+            return to_number(value)
+        except InvalidNumber:
+            reasons.append(f"{field} must be a number")
+            return None
+
+    def parse_job_date(value: str):
         try:
-            if not actual or not profit:
-                return ""
-            actual_f = float(actual)
-            profit_f = float(profit)
-            return str(actual_f - (actual_f * (profit_f / 100.0)))
-        except Exception:
-            return ""
+            return to_utc_datetime(value)
+        except InvalidDate:
+            return None
 
     for index, raw in enumerate(jobs_data):
         reasons = []
@@ -187,7 +168,7 @@ async def add_jobs_bulk(jobs_data: List[dict], current_user: dict = Depends(get_
         location = str(raw.get("location", "")).strip() if raw.get("location") else ""
         band = str(raw.get("salary_band") or raw.get("band") or "").strip()
         rate = str(raw.get("salary_rate") or raw.get("rate") or "").strip().lower()
-        profit_percentage = str(raw.get("profit_percentage") or "").strip()
+        profit_percentage = parse_number("profit_percentage", raw.get("profit_percentage"), reasons)
         assigned_hr_username = str(raw.get("assigned_hr") or "").strip()
         start_date_raw = str(raw.get("start_date") or "").strip()
         end_date_raw = str(raw.get("end_date") or "").strip()
@@ -209,11 +190,9 @@ async def add_jobs_bulk(jobs_data: List[dict], current_user: dict = Depends(get_
         if csa_id:
             if csa_id in seen_csa_ids:
                 reasons.append("duplicate csa_id in upload batch")
-            else:
-                # Check uniqueness in DB
-                if not await is_csa_unique(csa_id):
-                    reasons.append("csa_id already exists in database")
-            
+            elif csa_id in existing_csa_ids:
+                reasons.append("csa_id already exists in database")
+
         # Resolve assigned HR by username (case-insensitive)
         assigned_hr_id = None
         if assigned_hr_username:
@@ -222,49 +201,32 @@ async def add_jobs_bulk(jobs_data: List[dict], current_user: dict = Depends(get_
                 reasons.append("assigned_hr username not found")
 
         # Compute actual and expected if possible
-        salary_package = str(raw.get("actual_salary") or raw.get("salary_package") or "").strip()
-        if not salary_package and band and rate:
+        salary_package = parse_number("salary_package", raw.get("actual_salary") or raw.get("salary_package"), reasons)
+        if salary_package is None and band and rate:
             salary_package = compute_actual(band, rate)
-        expected_package = str(raw.get("expected_package") or "").strip()
-        if not expected_package and salary_package and profit_percentage:
+        expected_package = parse_number("expected_package", raw.get("expected_package"), reasons)
+        if expected_package is None:
             expected_package = compute_expected(salary_package, profit_percentage)
 
-        # Parse dates if present (dd-mm-yyyy). If invalid, set empty
-        def parse_dd_mm_yyyy(value: str):
-            if not value:
-                return ""
-            try:
-                # pandas not used here; manual parse
-                parts = value.replace("/", "-").split("-")
-                if len(parts) != 3:
-                    return ""
-                dd, mm, yyyy = parts[0].zfill(2), parts[1].zfill(2), parts[2]
-                if len(yyyy) != 4:
-                    return ""
-                return f"{yyyy}-{mm}-{dd}"
-            except Exception:
-                return ""
-
-        start_date = parse_dd_mm_yyyy(start_date_raw)
-        end_date = parse_dd_mm_yyyy(end_date_raw)
+        # Parse dates if present (dd-mm-yyyy or ISO). If invalid, leave unset
+        start_date = parse_job_date(start_date_raw)
+        end_date = parse_job_date(end_date_raw)
 
         # Skip row if any reasons collected
         if reasons:
             skipped_rows.append({"row_index": index + 1, "reasons": reasons})
             continue
 
-        # Build final job document
-        job_id = f"jb{datetime.now().strftime('%m%d%H%M')}{random.randint(10, 99)}"
+        # Build final job document (job IDs are assigned once the batch is validated)
         job_doc = {
-            "job_id": job_id,
             "title": title,
             "description": description,
             "location": location,
             "salary_band": band or None,
             "salary_rate": rate or None,
-            "salary_package": salary_package or "",
-            "profit_percentage": profit_percentage or None,
-            "expected_package": expected_package or None,
+            "salary_package": salary_package,
+            "profit_percentage": profit_percentage,
+            "expected_package": expected_package,
             "csa_id": csa_id,
             "priority": priority or None,
             "uploaded_by": str(current_user["_id"]),
@@ -276,16 +238,26 @@ async def add_jobs_bulk(jobs_data: List[dict], current_user: dict = Depends(get_
         if assigned_hr_id:
             job_doc["assigned_hr"] = assigned_hr_id
 
-        # Store parsed dates (or empty if missing/invalid)
+        # Store parsed dates (or null if missing/invalid)
         job_doc["start_date"] = start_date
         job_doc["end_date"] = end_date
 
-        await db.recruitment_portal.jobs.insert_one(job_doc)
-        added_count += 1
+        job_docs.append(job_doc)
+        job_rows.append(index + 1)
         seen_csa_ids.add(csa_id)
 
+    # Reserve one block of job IDs for the whole batch
+    await assign_job_ids(job_docs)
+
+    # The unique csa_id index rejects anything inserted since the prefetch
+    added_jobs, failures = await insert_jobs(db.recruitment_portal.jobs, job_docs)
+    skipped_rows.extend({"row_index": job_rows[position], "reasons": [reason]} for position, reason in failures.items())
+    skipped_rows.sort(key=lambda skipped: skipped["row_index"])
+
+    await record_jobs_created(added_jobs)
+
     return {
-        "added_count": added_count,
+        "added_count": len(added_jobs),
         "skipped_count": len(skipped_rows),
         "skipped_rows": skipped_rows
     }
@@ -303,20 +275,29 @@ async def update_job(
     job_update.pop("job_id", None)
     job_update.pop("uploaded_by", None)
     job_update.pop("created_at", None)
+    job_update.pop("search_prefixes", None)
     
     # Prevent manual setting of demand closed
     if "status" in job_update:
         if job_update["status"] not in MANUAL_JOB_STATUSES:
             raise HTTPException(status_code=400, detail="Invalid status. Allowed: open, closed, submitted.")
     
-    result = await db.recruitment_portal.jobs.update_one(
+    normalize_money_fields(job_update)
+    normalize_date_fields(job_update)
+    if "csa_id" in job_update:
+        job_update["search_prefixes"] = id_prefixes(job_id, job_update["csa_id"])
+    
+    previous_job = await db.recruitment_portal.jobs.find_one_and_update(
         {"job_id": job_id},
-        {"$set": job_update}
+        {"$set": job_update},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not previous_job or all(previous_job.get(key) == value for key, value in job_update.items()):
         raise HTTPException(status_code=404, detail="Job not found")
     
+    await record_job_change(previous_job, {**previous_job, **job_update})
+    
     return {"message": "Job updated successfully"}
 
 @router.get("/jobs")
@@ -329,6 +310,8 @@ async def get_all_jobs(
     search: Optional[str] = None,
     page: Optional[int] = 1,
     limit: Optional[int] = 25,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
     current_user: dict = Depends(get_current_admin_user)
 ):
     # Validate pagination parameters
@@ -339,99 +322,31 @@ async def get_all_jobs(
     
     db = await get_database()
     
-    # Update expired job statuses first
-    await update_expired_job_statuses()
-    
     # Build filter
-    filter_query = {}
-    if status:
-        filter_query["status"] = status
-    if assigned_hr:
-        filter_query["assigned_hr"] = assigned_hr
-    
-    # Handle search functionality
-    if search:
-        # Create a regex pattern for case-insensitive search
-        import re
-        search_pattern = re.compile(search, re.IGNORECASE)
-        filter_query["$or"] = [
-            {"title": search_pattern},
-            {"description": search_pattern},
-            {"job_id": search_pattern},
-            {"csa_id": search_pattern},
-            {"location": search_pattern},
-            {"salary_package": search_pattern}
-        ]
-    
-    # Handle date filtering
-    if report_type:
-        now = datetime.now(timezone.utc)
-        if report_type == "weekly":
-            # Last 7 days
-            start_date_range = now - timedelta(days=7)
-            filter_query["start_date"] = {
-                "$gte": start_date_range,
-                "$lte": now
-            }
-        elif report_type == "monthly":
-            # Last 30 days
-            start_date_range = now - timedelta(days=30)
-            filter_query["start_date"] = {
-                "$gte": start_date_range,
-                "$lte": now
-            }
-    else:
-        # Handle custom date range filtering
-        if start_date and end_date:
-            # Both dates provided - filter jobs with start_date between start and end (inclusive)
-            # Since dates are stored as strings in the database, compare as strings
-            filter_query["start_date"] = {"$gte": start_date, "$lte": end_date}
-        elif start_date:
-            # Only start date provided - filter jobs with start_date >= start_date
-            filter_query["start_date"] = {"$gte": start_date}
-        elif end_date:
-            # Only end date provided - filter jobs with start_date <= end_date
-            filter_query["start_date"] = {"$lte": end_date}
+    filter_query, ranked = await job_filter(
+        db.recruitment_portal.jobs, status, assigned_hr, report_type, start_date, end_date, search
+    )
 
-    # Get total count for pagination
-    total_jobs = await db.recruitment_portal.jobs.count_documents(filter_query)
-    
-    # Calculate pagination
-    total_pages = (total_jobs + limit - 1) // limit
-    skip = (page - 1) * limit
-    
     # Get all HR users for name mapping
     hr_users = await db.recruitment_portal.users.find({"role": "hr"}).to_list(length=100)
     hr_user_map = {str(user["_id"]): user["name"] for user in hr_users}
     
-    # Get paginated jobs
-    jobs = await db.recruitment_portal.jobs.find(filter_query).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
-    
-    for job in jobs:
-        job["id"] = str(job["_id"])
-        del job["_id"]
-        # Convert datetime fields to ISO format for JSON serialization
-        if "created_at" in job and isinstance(job["created_at"], datetime):
-            job["created_at"] = job["created_at"].isoformat()
-        if "start_date" in job and isinstance(job["start_date"], datetime):
-            job["start_date"] = job["start_date"].isoformat()
-        if "end_date" in job and isinstance(job["end_date"], datetime):
-            job["end_date"] = job["end_date"].isoformat()
+    # Get paginated jobs (by page, or after a cursor when one is passed)
+    jobs, pagination = await find_page(
+        db.recruitment_portal.jobs, filter_query, "created_at",
+        page=page, limit=limit, cursor=cursor, count=count, projection=HIDE_SEARCH_FIELDS,
+        sort_prefix=search_sort(ranked, []), total_key="total_jobs"
+    )
+    
+    for job in with_ids(jobs):
         # Add HR user name if assigned
         if job.get("assigned_hr"):
             job["assigned_hr_name"] = hr_user_map.get(job["assigned_hr"], "Unknown")
     
-    return {
+    return BSONJSONResponse({
         "jobs": jobs,
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total_jobs": total_jobs,
-            "total_pages": total_pages,
-            "has_next": page < total_pages,
-            "has_prev": page > 1
-        }
-    }
+        "pagination": pagination
+    })
 
 @router.put("/jobs/{job_id}/allocate")
 async def allocate_job(
@@ -446,14 +361,18 @@ async def allocate_job(
     if not hr_user:
         raise HTTPException(status_code=404, detail="HR user not found")
     
-    result = await db.recruitment_portal.jobs.update_one(
+    allocation = {"assigned_hr": hr_id, "status": "allocated"}
+    previous_job = await db.recruitment_portal.jobs.find_one_and_update(
         {"job_id": job_id},
-        {"$set": {"assigned_hr": hr_id, "status": "allocated"}}
+        {"$set": allocation},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not previous_job or all(previous_job.get(key) == value for key, value in allocation.items()):
         raise HTTPException(status_code=404, detail="Job not found")
     
+    await record_job_change(previous_job, {**previous_job, **allocation})
+    
     return {"message": "Job allocated successfully"}
 
 @router.get("/users")
@@ -462,15 +381,10 @@ async def get_all_users(current_user: dict = Depends(get_current_admin_user)):
     
     users = await db.recruitment_portal.users.find({"role": "hr"}).to_list(length=100)
     
-    for user in users:
-        user["id"] = str(user["_id"])
-        del user["_id"]
+    for user in with_ids(users):
         del user["password"]  # Don't send password
-        # Convert datetime fields to ISO format for JSON serialization
-        if "created_at" in user and isinstance(user["created_at"], datetime):
-            user["created_at"] = user["created_at"].isoformat()
     
-    return users
+    return BSONJSONResponse(users)
 
 @router.post("/users")
 async def create_hr_user(user_data: dict, current_user: dict = Depends(get_current_admin_user)):
@@ -486,7 +400,7 @@ async def create_hr_user(user_data: dict, current_user: dict = Depends(get_curre
     
     created_at = datetime.now(timezone.utc)
     user_data["role"] = "hr"
-    user_data["password"] = get_password_hash(user_data["password"])
+    user_data["password"] = await get_password_hash(user_data["password"])
     user_data["created_at"] = created_at
     
     result = await db.recruitment_portal.users.insert_one(user_data)
@@ -512,6 +426,7 @@ async def delete_hr_user(user_id: str, current_user: dict = Depends(get_current_
         raise HTTPException(status_code=400, detail="Cannot delete HR user with allocated jobs")
     
     result = await db.recruitment_portal.users.delete_one({"_id": ObjectId(user_id)})
+    principal_cache.invalidate_user_id(user_id)
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -534,7 +449,7 @@ async def update_hr_user(
     # Hash password if provided
     if "password" in user_update and user_update["password"]:
         from routes.auth import get_password_hash
-        user_update["password"] = get_password_hash(user_update["password"])
+        user_update["password"] = await get_password_hash(user_update["password"])
     elif "password" in user_update:
         del user_update["password"]
     
@@ -542,6 +457,7 @@ async def update_hr_user(
         {"_id": ObjectId(user_id), "role": "hr"},
         {"$set": user_update}
     )
+    principal_cache.invalidate_user_id(user_id)
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="HR user not found")
@@ -564,6 +480,36 @@ async def get_hr_users_for_filter(current_user: dict = Depends(get_current_admin
     
     return hr_list
 
+@router.get("/password-hashing/stats")
+async def get_password_hashing_stats(current_user: dict = Depends(get_current_admin_user)):
+    """
+    Report queue depth, rejections and hash/queue-wait latency of the password hashing executor.
+    """
+    return password_hasher.snapshot()
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats(current_user: dict = Depends(get_current_admin_user)):
+    """
+    Report run counts, failures, skipped overlapping runs and run durations of the scheduled jobs.
+    """
+    return scheduler.snapshot()
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: Optional[int] = 100,
+    collection: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Most recent entries of the slow query log (newest first), with their explain() summaries.
+    """
+    if limit < 1 or limit > 1000:
+        limit = 100
+    db = await get_database()
+    filter_query = {"collection": collection} if collection else {}
+    cursor = db.recruitment_portal[SLOW_QUERIES_COLLECTION].find(filter_query).sort("$natural", -1).limit(limit)
+    return BSONJSONResponse(with_ids(await cursor.to_list(length=limit)))
+
 @router.get("/dashboard")
 async def get_dashboard(
     report_type: Optional[str] = None,  # "weekly", "monthly", "custom"
@@ -576,36 +522,9 @@ async def get_dashboard(
     
     # Build date filter based on report type
     date_filter = {}
-    if report_type:
-        
-        now = datetime.now(timezone.utc)
-        
-        if report_type == "weekly":
-            # Last 7 days - convert to string format for comparison
-            start_date = now - timedelta(days=7)
-            date_filter = {
-                "start_date": {
-                    "$gte": start_date.strftime("%Y-%m-%d"),
-                    "$lte": now.strftime("%Y-%m-%d")
-                }
-            }
-        elif report_type == "monthly":
-            # Last 30 days - convert to string format for comparison
-            start_date = now - timedelta(days=30)
-            date_filter = {
-                "start_date": {
-                    "$gte": start_date.strftime("%Y-%m-%d"),
-                    "$lte": now.strftime("%Y-%m-%d")
-                }
-            }
-        elif report_type == "custom" and custom_start_date and custom_end_date:
-            # Custom date range - filter by start_date to match jobs filtering logic
-            date_filter = {
-                "start_date": {
-                    "$gte": custom_start_date,
-                    "$lte": custom_end_date
-                }
-            }
+    start_date_range = report_date_range(report_type, custom_start_date, custom_end_date)
+    if start_date_range:
+        date_filter = {"start_date": start_date_range}
     
     # Build HR filter
     hr_filter = {}
@@ -619,66 +538,67 @@ async def get_dashboard(
     if hr_id:
         candidate_filter["created_by"] = hr_id
     
-    # Get job counts with filters
-    total_jobs = await db.recruitment_portal.jobs.count_documents(job_filter)
-    open_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "status": "open"})
-    closed_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "status": "closed"})
-    submitted_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "status": "submitted"})
-    demand_closed_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "status": "demand closed"})
-    
-    # Get candidate counts with filters
-    total_candidates = await db.recruitment_portal.candidates.count_documents(candidate_filter)
-    applied_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "status": "applied"})
-    screen_reject_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "status": "screen_reject"})
-    interview_selected_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "status": "interview_selected"})
-    interview_reject_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "status": "interview_reject"})
-    no_show_for_joining_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "status": "no_show_for_joining"})
-    placed_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "status": "placed"})
-    
-    # Get HR user count (no filter for this)
-    hr_users = await db.recruitment_portal.users.count_documents({"role": "hr"})
+    async def get_status_counts():
+        """Return ({"filtered", "hr"} job counts, {"filtered", "hr"} candidate counts) by status."""
+        if await counters_ready():
+            # Read the materialized dashboard counters instead of scanning jobs and candidates.
+            # Candidate counters are bucketed by the day the candidate was created.
+            day_from = day_to = None
+            if start_date_range:
+                day_from = day_key(start_date_range["$gte"])
+                day_to = day_key(start_date_range["$lt"] - timedelta(days=1))
+            reads = [
+                read_status_counts(JOB_KIND, hr_id, day_from, day_to),
+                read_status_counts(CANDIDATE_KIND, hr_id, day_from, day_to)
+            ]
+            if hr_id:
+                reads += [read_status_counts(JOB_KIND, hr_id), read_status_counts(CANDIDATE_KIND, hr_id)]
+            results = await asyncio.gather(*reads)
+            job_counts, candidate_counts = {"filtered": results[0]}, {"filtered": results[1]}
+            if hr_id:
+                job_counts["hr"], candidate_counts["hr"] = results[2], results[3]
+            return job_counts, candidate_counts
+        
+        # Until the counters are built, count every job and candidate status in one aggregation
+        # per collection. With an HR selected, a second facet gives the unfiltered HR numbers.
+        if hr_id:
+            job_base, job_facets = {"assigned_hr": hr_id}, {"filtered": date_filter, "hr": {}}
+            candidate_base, candidate_facets = {"created_by": hr_id}, {"filtered": date_filter, "hr": {}}
+        else:
+            job_base, job_facets = job_filter, {"filtered": {}}
+            candidate_base, candidate_facets = candidate_filter, {"filtered": {}}
+        return await asyncio.gather(
+            count_by_status(db.recruitment_portal.jobs, job_base, job_facets),
+            count_by_status(db.recruitment_portal.candidates, candidate_base, candidate_facets)
+        )
+    
+    async def get_hr_user():
+        if not hr_id:
+            return None
+        return await db.recruitment_portal.users.find_one({"_id": ObjectId(hr_id), "role": "hr"})
+    
+    (job_counts, candidate_counts), hr_users, hr_user = await asyncio.gather(
+        get_status_counts(),
+        # Get HR user count (no filter for this)
+        db.recruitment_portal.users.count_documents({"role": "hr"}),
+        get_hr_user()
+    )
     
     # Get HR performance data if HR filter is applied
     hr_performance = None
-    if hr_id:
-        hr_user = await db.recruitment_portal.users.find_one({"_id": ObjectId(hr_id), "role": "hr"})
-        if hr_user:
-            # Get jobs assigned to this HR
-            hr_jobs = await db.recruitment_portal.jobs.find({"assigned_hr": hr_id}).to_list(length=1000)
-            
-            # Get candidates created by this HR
-            hr_candidates = await db.recruitment_portal.candidates.find({"created_by": hr_id}).to_list(length=1000)
-            
-            hr_performance = {
-                "hr_name": hr_user["name"],
-                "hr_email": hr_user["email"],
-                "total_assigned_jobs": len(hr_jobs),
-                "open_jobs": len([j for j in hr_jobs if j["status"] == "open"]),
-                "closed_jobs": len([j for j in hr_jobs if j["status"] == "closed"]),
-                "submitted_jobs": len([j for j in hr_jobs if j["status"] == "submitted"]),
-                "demand_closed_jobs": len([j for j in hr_jobs if j["status"] == "demand closed"]),
-                "total_candidates": len(hr_candidates),
-                "applied_candidates": len([c for c in hr_candidates if c["status"] == "applied"]),
-                "screen_reject_candidates": len([c for c in hr_candidates if c["status"] == "screen_reject"]),
-                "interview_selected_candidates": len([c for c in hr_candidates if c["status"] == "interview_selected"]),
-                "interview_reject_candidates": len([c for c in hr_candidates if c["status"] == "interview_reject"]),
-                "no_show_for_joining_candidates": len([c for c in hr_candidates if c["status"] == "no_show_for_joining"]),
-                "placed_candidates": len([c for c in hr_candidates if c["status"] == "placed"])
-            }
+    if hr_user:
+        hr_job_summary = job_status_summary(job_counts["hr"])
+        hr_performance = {
+            "hr_name": hr_user["name"],
+            "hr_email": hr_user["email"],
+            "total_assigned_jobs": hr_job_summary.pop("total_jobs"),
+            **hr_job_summary,
+            **candidate_status_summary(candidate_counts["hr"])
+        }
     
     return {
-        "total_jobs": total_jobs,
-        "open_jobs": open_jobs,
-        "closed_jobs": closed_jobs,
-        "submitted_jobs": submitted_jobs,
-        "demand_closed_jobs": demand_closed_jobs,
-        "total_candidates": total_candidates,
-        "applied_candidates": applied_candidates,
-        "screen_reject_candidates": screen_reject_candidates,
-        "interview_selected_candidates": interview_selected_candidates,
-        "interview_reject_candidates": interview_reject_candidates,
-        "no_show_for_joining_candidates": no_show_for_joining_candidates,
-        "placed_candidates": placed_candidates,
+        **job_status_summary(job_counts["filtered"]),
+        **candidate_status_summary(candidate_counts["filtered"]),
         "hr_users": hr_users,
         "hr_performance": hr_performance,
         "filters_applied": {
@@ -689,45 +609,96 @@ async def get_dashboard(
         }
     }
 
+def _is_blank(field: str) -> dict:
+    return {"$eq": [{"$ifNull": [f"${field}", ""]}, ""]}
+
+# Resolve each candidate's job title and creating HR user, reading only those two fields
+CANDIDATE_ENRICHMENT_STAGES = [
+    {"$lookup": {
+        "from": "jobs",
+        "let": {"job_id": "$job_id"},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$job_id", "$$job_id"]}}},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "title": 1}}
+        ],
+        "as": "_job"
+    }},
+    {"$lookup": {
+        "from": "users",
+        "let": {"created_by": {"$convert": {"input": "$created_by", "to": "objectId", "onError": None, "onNull": None}}},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$_id", "$$created_by"]}, "role": "hr"}},
+            {"$project": {"_id": 0, "name": 1}}
+        ],
+        "as": "_hr"
+    }},
+    {"$addFields": {
+        "_job_title": {"$ifNull": [{"$arrayElemAt": ["$_job.title", 0]}, "Unknown Job"]},
+        "created_by_hr": {"$ifNull": [{"$arrayElemAt": ["$_hr.name", 0]}, "Unknown HR"]}
+    }},
+    {"$addFields": {
+        "applied_for": {"$cond": [_is_blank("job_id"), "$$REMOVE", "$_job_title"]},
+        "job_title": {"$cond": [{"$and": [{"$not": [_is_blank("job_id")]}, _is_blank("job_title")]}, "$_job_title", "$job_title"]},
+        "title_position": {"$cond": [{"$and": [{"$not": [_is_blank("job_id")]}, _is_blank("title_position")]}, "$_job_title", "$title_position"]},
+        "role_applied_for": {"$cond": [{"$and": [{"$not": [_is_blank("job_id")]}, _is_blank("role_applied_for")]}, "$_job_title", "$role_applied_for"]}
+    }},
+    {"$project": {"_job": 0, "_hr": 0, "_job_title": 0}}
+]
+
 @router.get("/candidates")
-async def get_all_candidates(current_user: dict = Depends(get_current_admin_user)):
+async def get_all_candidates(
+    status: Optional[str] = None,
+    hr_id: Optional[str] = None,
+    job_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    page: Optional[int] = None,
+    limit: Optional[int] = 25,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Candidates newest first, filtered by status, creating HR, job and created_at day range.
+    With `page` or `cursor` the response is {"candidates": [...], "pagination": {...}};
+    without either it is the original plain list of the newest 100.
+    Only the summary fields are returned unless `fields` names others (or is "all").
+    """
     db = await get_database()
     
-    candidates = await db.recruitment_portal.candidates.find({}).sort("created_at", -1).to_list(length=100)
+    # Build filter
+    filter_query = candidate_filter(status, hr_id, job_id, start_date, end_date)
+    
+    paginated = page is not None or cursor is not None
+    if paginated:
+        # Validate pagination parameters
+        if page is None or page < 1:
+            page = 1
+        if limit < 1 or limit > 100:
+            limit = 25
+    else:
+        page, limit, count = 1, 100, "none"
     
-    # Get all jobs for job title mapping
-    jobs = await db.recruitment_portal.jobs.find({}).to_list(length=1000)
-    job_map = {job["job_id"]: job["title"] for job in jobs}
+    projection = projection_for(fields, CANDIDATE_SUMMARY_FIELDS, CANDIDATE_REQUIRED_FIELDS)
+    stages = ([{"$project": projection}] if projection else []) + CANDIDATE_ENRICHMENT_STAGES
     
-    # Get all HR users for name mapping
-    hr_users = await db.recruitment_portal.users.find({"role": "hr"}).to_list(length=100)
-    hr_user_map = {str(user["_id"]): user["name"] for user in hr_users}
+    candidates, pagination = await aggregate_page(
+        db.recruitment_portal.candidates, filter_query, "created_at",
+        page=page, limit=limit, cursor=cursor, count=count,
+        stages=stages, total_key="total_candidates"
+    )
     
-    for candidate in candidates:
-        candidate["id"] = str(candidate["_id"])
-        del candidate["_id"]
-        # Convert datetime fields to ISO format for JSON serialization
-        if "created_at" in candidate and isinstance(candidate["created_at"], datetime):
-            candidate["created_at"] = candidate["created_at"].isoformat()
-        
-        # Add job title information
-        if candidate.get("job_id"):
-            candidate["applied_for"] = job_map.get(candidate["job_id"], "Unknown Job")
-            # Ensure job title is available for display
-            if not candidate.get("job_title"):
-                candidate["job_title"] = job_map.get(candidate["job_id"], "Unknown Job")
-            if not candidate.get("title_position"):
-                candidate["title_position"] = job_map.get(candidate["job_id"], "Unknown Job")
-            if not candidate.get("role_applied_for"):
-                candidate["role_applied_for"] = job_map.get(candidate["job_id"], "Unknown Job")
-        
-        # Add HR user information who created the candidate
-        if candidate.get("created_by"):
-            candidate["created_by_hr"] = hr_user_map.get(candidate["created_by"], "Unknown HR")
-        else:
-            candidate["created_by_hr"] = "Unknown HR"
+    with_ids(candidates)
+    
+    if not paginated:
+        return BSONJSONResponse(candidates)
     
-    return candidates 
+    return BSONJSONResponse({
+        "candidates": candidates,
+        "pagination": pagination
+    })
 
 @router.get("/hr-contribution")
 async def get_hr_contribution(current_user: dict = Depends(get_current_admin_user)):
@@ -790,35 +761,9 @@ async def download_hr_report(
     
     # Build date filter based on report type
     date_filter = {}
-    if report_type:
-        now = datetime.now(timezone.utc)
-        
-        if report_type == "weekly":
-            # Last 7 days
-            start_date = now - timedelta(days=7)
-            date_filter = {
-                "start_date": {
-                    "$gte": start_date.strftime("%Y-%m-%d"),
-                    "$lte": now.strftime("%Y-%m-%d")
-                }
-            }
-        elif report_type == "monthly":
-            # Last 30 days
-            start_date = now - timedelta(days=30)
-            date_filter = {
-                "start_date": {
-                    "$gte": start_date.strftime("%Y-%m-%d"),
-                    "$lte": now.strftime("%Y-%m-%d")
-                }
-            }
-        elif report_type == "custom" and custom_start_date and custom_end_date:
-            # Custom date range
-            date_filter = {
-                "start_date": {
-                    "$gte": custom_start_date,
-                    "$lte": custom_end_date
-                }
-            }
+    start_date_range = report_date_range(report_type, custom_start_date, custom_end_date)
+    if start_date_range:
+        date_filter = {"start_date": start_date_range}
     
     # Build HR filter
     hr_filter = {}
@@ -842,70 +787,80 @@ async def download_hr_report(
     if not hr_users:
         raise HTTPException(status_code=404, detail="No HR users found")
     
-    # Prepare Excel data
-    excel_data = []
+    hr_ids = [str(hr_user["_id"]) for hr_user in hr_users]
+    
+    # Job statistics for every HR in one grouped aggregation
+    job_stats_pipeline = [
+        {"$match": {**job_filter, "assigned_hr": {"$in": hr_ids}}},
+        {"$group": {"_id": {"hr": "$assigned_hr", "status": "$status"}, "count": {"$sum": 1}}}
+    ]
+    
+    # Candidate statistics for every HR: totals, and the selected candidates' names.
+    # Kept as separate pipelines (not a $facet) so no single result document has to hold
+    # every selected candidate of the date range.
+    candidate_match = {"$match": {**candidate_filter, "created_by": {"$in": hr_ids}}}
+    candidate_totals_pipeline = [
+        candidate_match,
+        {"$group": {"_id": "$created_by", "count": {"$sum": 1}}}
+    ]
+    selected_candidates_pipeline = [
+        candidate_match,
+        {"$match": {"status": "selected"}},
+        {"$group": {
+            "_id": "$created_by",
+            "count": {"$sum": 1},
+            "details": {"$push": {"$concat": [
+                {"$toString": {"$ifNull": ["$name", "N/A"]}},
+                " - ",
+                {"$toString": {"$ifNull": ["$job_title", "N/A"]}}
+            ]}}
+        }}
+    ]
+    
+    job_groups, candidate_groups, selected_groups = await asyncio.gather(
+        db.recruitment_portal.jobs.aggregate(job_stats_pipeline).to_list(length=None),
+        db.recruitment_portal.candidates.aggregate(candidate_totals_pipeline).to_list(length=None),
+        db.recruitment_portal.candidates.aggregate(selected_candidates_pipeline).to_list(length=None)
+    )
     
+    job_counts = {}
+    for group in job_groups:
+        job_counts.setdefault(group["_id"]["hr"], {})[group["_id"].get("status")] = group["count"]
+    candidate_totals = {group["_id"]: group["count"] for group in candidate_groups}
+    selected_stats = {group["_id"]: group for group in selected_groups}
+    
+    headers = [
+        "HR Name",
+        "HR Email",
+        "Total Jobs Allocated",
+        "Open Jobs",
+        "Closed Jobs",
+        "Submitted Jobs",
+        "Demand Closed Jobs",
+        "Total Candidates Added",
+        "Selected Candidates Count",
+        "Selected Candidates (Name - Job Title)"
+    ]
+    
+    rows = []
     for hr_user in hr_users:
         hr_id_str = str(hr_user["_id"])
+        hr_job_counts = job_counts.get(hr_id_str, {})
+        selected = selected_stats.get(hr_id_str, {})
+        candidate_details = selected.get("details", [])
         
-        # Get job statistics for this HR
-        total_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "assigned_hr": hr_id_str})
-        open_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "assigned_hr": hr_id_str, "status": "open"})
-        closed_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "assigned_hr": hr_id_str, "status": "closed"})
-        submitted_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "assigned_hr": hr_id_str, "status": "submitted"})
-        demand_closed_jobs = await db.recruitment_portal.jobs.count_documents({**job_filter, "assigned_hr": hr_id_str, "status": "demand closed"})
-        
-        # Get candidate statistics for this HR
-        total_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "created_by": hr_id_str})
-        selected_candidates = await db.recruitment_portal.candidates.count_documents({**candidate_filter, "created_by": hr_id_str, "status": "selected"})
-        
-        # Get selected candidates with job titles
-        selected_candidates_data = await db.recruitment_portal.candidates.find(
-            {**candidate_filter, "created_by": hr_id_str, "status": "selected"}
-        ).to_list(length=1000)
-        
-        # Prepare candidate names with job titles
-        candidate_details = []
-        for candidate in selected_candidates_data:
-            candidate_details.append(f"{candidate.get('name', 'N/A')} - {candidate.get('job_title', 'N/A')}")
-        
-        # Add to Excel data
-        excel_data.append({
-            "HR Name": hr_user["name"],
-            "HR Email": hr_user["email"],
-            "Total Jobs Allocated": total_jobs,
-            "Open Jobs": open_jobs,
-            "Closed Jobs": closed_jobs,
-            "Submitted Jobs": submitted_jobs,
-            "Demand Closed Jobs": demand_closed_jobs,
-            "Total Candidates Added": total_candidates,
-            "Selected Candidates Count": selected_candidates,
-            "Selected Candidates (Name - Job Title)": "; ".join(candidate_details) if candidate_details else "None"
-        })
-    
-    # Create Excel file
-    df = pd.DataFrame(excel_data)
-    
-    # Create Excel writer
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='HR Report', index=False)
-        
-        # Auto-adjust column widths
-        worksheet = writer.sheets['HR Report']
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-    
-    output.seek(0)
+        rows.append([
+            hr_user["name"],
+            hr_user["email"],
+            sum(hr_job_counts.values()),
+            hr_job_counts.get("open", 0),
+            hr_job_counts.get("closed", 0),
+            hr_job_counts.get("submitted", 0),
+            hr_job_counts.get("demand closed", 0),
+            candidate_totals.get(hr_id_str, 0),
+            selected.get("count", 0),
+            "; ".join(candidate_details) if candidate_details else "None"
+        ])
     
     # Generate filename
     if hr_id:
@@ -915,8 +870,8 @@ async def download_hr_report(
         filename = f"All_HR_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
     
     return StreamingResponse(
-        io.BytesIO(output.getvalue()),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        iter_xlsx(rows, "HR Report", headers),
+        media_type=EXCEL_MEDIA_TYPE,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     ) 
 
@@ -942,55 +897,91 @@ async def delete_job(job_id: str, current_user: dict = Depends(get_current_admin
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    await record_jobs_removed([job])
+    
     return {"message": "Job deleted successfully"} 
 
+def _quarter_start(year: int, quarter: int) -> datetime:
+    return datetime(year, 3 * (quarter - 1) + 1, 1)
+
+def _revenue_period(year: Optional[int], quarter: Optional[int],
+                    end_year: Optional[int], end_quarter: Optional[int]):
+    """
+    Resolve the revenue query parameters to a [start, end) datetime range.
+    year/quarter select the first period (default: the current year); end_year/end_quarter
+    optionally extend the range through a later period.
+    """
+    for value in (quarter, end_quarter):
+        if value is not None and not 1 <= value <= 4:
+            raise HTTPException(status_code=400, detail="Quarter must be between 1 and 4")
+    
+    start_year = year or datetime.now().year
+    if end_year is None and end_quarter is None:
+        last_year, last_quarter = start_year, quarter or 4
+    else:
+        last_year, last_quarter = end_year or start_year, end_quarter or 4
+    
+    start = _quarter_start(start_year, quarter or 1)
+    end = _quarter_start(last_year + 1, 1) if last_quarter == 4 else _quarter_start(last_year, last_quarter + 1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Revenue period end must be after its start")
+    return start, end
+
+def _as_double(field: str) -> dict:
+    # Amounts may still be stored as strings; unparseable or missing values count as 0
+    return {"$convert": {"input": field, "to": "double", "onError": 0, "onNull": 0}}
+
 @router.get("/hr-revenue")
-async def get_hr_revenue(current_user: dict = Depends(get_current_admin_user)):
+async def get_hr_revenue(
+    year: Optional[int] = None,
+    quarter: Optional[int] = None,
+    end_year: Optional[int] = None,
+    end_quarter: Optional[int] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
     db = await get_database()
     
-    # Get current year for annual revenue calculation
-    current_year = datetime.now().year
-    start_of_year = datetime(current_year, 1, 1)
-    end_of_year = datetime(current_year, 12, 31, 23, 59, 59)
-    
-    # Get all placed candidates for the current year
-    placed_candidates = await db.recruitment_portal.candidates.find({
-        "status": "placed",
-        "created_at": {
-            "$gte": start_of_year,
-            "$lte": end_of_year
-        }
-    }).to_list(length=1000)
-    
-    # Get all HR users
-    hr_users = await db.recruitment_portal.users.find({"role": "hr"}).to_list(length=100)
+    # Defaults to the current year for annual revenue calculation
+    period_start, period_end = _revenue_period(year, quarter, end_year, end_quarter)
+    
+    # Join placed candidates to their jobs and sum revenue (actual_salary - expected_package) per HR
+    pipeline = [
+        {"$match": {
+            "status": "placed",
+            "created_at": {"$gte": period_start, "$lt": period_end},
+            "created_by": {"$nin": [None, ""]}
+        }},
+        {"$lookup": {
+            "from": "jobs",
+            "let": {"job_id": "$job_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$job_id", "$$job_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "salary_package": 1, "expected_package": 1}}
+            ],
+            "as": "job"
+        }},
+        {"$unwind": "$job"},
+        {"$group": {
+            "_id": "$created_by",
+            "revenue": {"$sum": {"$subtract": [
+                _as_double("$job.salary_package"),
+                _as_double("$job.expected_package")
+            ]}}
+        }}
+    ]
+    
+    revenue_groups, hr_users = await asyncio.gather(
+        db.recruitment_portal.candidates.aggregate(pipeline).to_list(length=None),
+        db.recruitment_portal.users.find({"role": "hr"}, {"name": 1}).to_list(length=None)
+    )
     hr_map = {str(hr["_id"]): hr["name"] for hr in hr_users}
     
-    # Calculate revenue for each HR
+    # Revenue is reported per HR name
     hr_revenue = {}
-    
-    for candidate in placed_candidates:
-        hr_id = candidate.get("created_by")
-        if not hr_id:
-            continue
-            
-        hr_name = hr_map.get(hr_id, "Unknown HR")
-        
-        # Get the job details to calculate revenue
-        job = await db.recruitment_portal.jobs.find_one({"job_id": candidate.get("job_id")})
-        if not job:
-            continue
-            
-        # Calculate revenue: actual_salary - expected_package
-        actual_salary = float(job.get("salary_package", 0)) if job.get("salary_package") else 0
-        expected_package = float(job.get("expected_package", 0)) if job.get("expected_package") else 0
-        
-        revenue = actual_salary - expected_package
-        
-        if hr_name not in hr_revenue:
-            hr_revenue[hr_name] = 0
-        
-        hr_revenue[hr_name] += revenue
+    for group in revenue_groups:
+        hr_name = hr_map.get(group["_id"], "Unknown HR")
+        hr_revenue[hr_name] = hr_revenue.get(hr_name, 0) + group["revenue"]
     
     # Convert to list format for frontend
     revenue_data = []
@@ -1010,6 +1001,8 @@ async def get_job_history(
     page: Optional[int] = 1,
     limit: Optional[int] = 25,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
     current_user: dict = Depends(get_current_admin_user)
 ):
     """
@@ -1025,70 +1018,29 @@ async def get_job_history(
     db = await get_database()
     
     # Build filter
-    filter_query = {}
-    
-    # Handle search functionality
-    if search:
-        # Create a regex pattern for case-insensitive search
-        import re
-        search_pattern = re.compile(search, re.IGNORECASE)
-        filter_query["$or"] = [
-            {"title": search_pattern},
-            {"description": search_pattern},
-            {"job_id": search_pattern},
-            {"csa_id": search_pattern},
-            {"location": search_pattern},
-            {"salary_package": search_pattern}
-        ]
-    
-    # Get total count for pagination
-    total_jobs = await db.recruitment_portal.job_history.count_documents(filter_query)
-    
-    # Calculate pagination
-    total_pages = (total_jobs + limit - 1) // limit
-    skip = (page - 1) * limit
+    filter_query, ranked = await job_history_filter(db.recruitment_portal.job_history, search)
     
     # Get all HR users for name mapping
     hr_users = await db.recruitment_portal.users.find({"role": "hr"}).to_list(length=100)
     hr_user_map = {str(user["_id"]): user["name"] for user in hr_users}
     
-    # Get paginated job history
-    jobs = await db.recruitment_portal.job_history.find(filter_query).sort("moved_to_history_date", -1).skip(skip).limit(limit).to_list(length=limit)
+    # Get paginated job history (by page, or after a cursor when one is passed)
+    jobs, pagination = await find_page(
+        db.recruitment_portal.job_history, filter_query, "moved_to_history_date",
+        page=page, limit=limit, cursor=cursor, count=count, projection=HIDE_SEARCH_FIELDS,
+        sort_prefix=search_sort(ranked, []), total_key="total_jobs"
+    )
     
-    for job in jobs:
-        # Convert ObjectId to string for JSON serialization
-        job["id"] = str(job["_id"])
-        del job["_id"]
-        
-        # Handle original_job_id if it exists (it's also an ObjectId)
-        if "original_job_id" in job and job["original_job_id"]:
-            job["original_job_id"] = str(job["original_job_id"])
-        
-        # Convert datetime fields to ISO format for JSON serialization
-        if "created_at" in job and isinstance(job["created_at"], datetime):
-            job["created_at"] = job["created_at"].isoformat()
-        if "start_date" in job and isinstance(job["start_date"], datetime):
-            job["start_date"] = job["start_date"].isoformat()
-        if "end_date" in job and isinstance(job["end_date"], datetime):
-            job["end_date"] = job["end_date"].isoformat()
-        if "moved_to_history_date" in job and isinstance(job["moved_to_history_date"], datetime):
-            job["moved_to_history_date"] = job["moved_to_history_date"].isoformat()
-        
+    # ObjectIds (including original_job_id) and datetimes are encoded by the response class
+    for job in with_ids(jobs):
         # Add HR user name if assigned
         if job.get("assigned_hr"):
             job["assigned_hr_name"] = hr_user_map.get(job["assigned_hr"], "Unknown")
     
-    return {
+    return BSONJSONResponse({
         "jobs": jobs,
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total_jobs": total_jobs,
-            "total_pages": total_pages,
-            "has_next": page < total_pages,
-            "has_prev": page > 1
-        }
-    }
+        "pagination": pagination
+    })
 
 @router.delete("/job-history/bulk-delete")
 async def bulk_delete_job_history(
@@ -1138,17 +1090,18 @@ async def change_password(
     db = await get_database()
     
     # Verify current password
-    if not verify_password(current_password, current_user["password"]):
+    if not await verify_password(current_password, current_user["password"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Hash new password
-    hashed_new_password = get_password_hash(new_password)
+    hashed_new_password = await get_password_hash(new_password)
     
     # Update password in database
     result = await db.recruitment_portal.users.update_one(
         {"_id": current_user["_id"]},
         {"$set": {"password": hashed_new_password}}
     )
+    principal_cache.invalidate_user_id(current_user["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="Failed to update password")
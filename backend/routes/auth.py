@@ -2,24 +2,24 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from bson import ObjectId
 from typing import Optional
 from pydantic import BaseModel
 from models import UserCreate, Token, TokenData
 from database import get_database
+from user_cache import principal_cache
+from password_hashing import password_hasher
 from config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -46,10 +46,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
+    # Serve warm requests from the principal cache without a database round trip
+    user = principal_cache.get(token_data.email)
+    if user is not None:
+        return user
+    
     db = await get_database()
     user = await db.recruitment_portal.users.find_one({"email": token_data.email})
     if user is None:
         raise credentials_exception
+    principal_cache.set(token_data.email, user)
     return user
 
 async def get_current_admin_user(current_user: dict = Depends(get_current_user)):
@@ -73,7 +79,7 @@ async def register(user: UserCreate):
     
     # Create new user
     user_data = user.model_dump()
-    user_data["password"] = get_password_hash(user.password)
+    user_data["password"] = await get_password_hash(user.password)
     user_data["created_at"] = datetime.utcnow()
     
     result = await db.recruitment_portal.users.insert_one(user_data)
@@ -96,7 +102,7 @@ async def login(login_data: LoginRequest):
     db = await get_database()
     
     user = await db.recruitment_portal.users.find_one({"email": login_data.email})
-    if not user or not verify_password(login_data.password, user["password"]):
+    if not user or not await verify_password(login_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
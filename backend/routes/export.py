@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Optional, Sequence
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from routes.auth import get_current_admin_user
+from database import get_database
+from config import settings
+from fieldsets import projection_for, CANDIDATE_SUMMARY_FIELDS, JOB_EXPORT_FIELDS, JOB_HISTORY_EXPORT_FIELDS
+from list_filters import job_filter, job_history_filter, candidate_filter
+from report_writer import (
+    iter_csv, iter_ndjson, iter_xlsx, document_rows, XLSX_MAX_ROWS,
+    CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, EXCEL_MEDIA_TYPE
+)
+from search import HIDE_SEARCH_FIELDS
+
+router = APIRouter(prefix="/admin/export", tags=["Export"])
+
+EXPORT_FORMATS = {
+    "csv": CSV_MEDIA_TYPE,
+    "ndjson": NDJSON_MEDIA_TYPE,
+    "xlsx": EXCEL_MEDIA_TYPE
+}
+
+async def _with_string_ids(cursor):
+    async for doc in cursor:
+        doc["id"] = str(doc.pop("_id"))
+        yield doc
+
+async def _export(collection, name: str, filter_query: dict, export_format: str,
+                  fields: Optional[str], default_fields: Sequence[str]) -> StreamingResponse:
+    """
+    Stream every document matching the filter straight from the cursor, in _id order.
+    All formats are sent as they are produced; XLSX rows are serialized in the threadpool.
+    Columns are `fields` (or the default export fields); NDJSON also accepts fields=all for
+    whole documents. XLSX exports larger than one sheet are rejected rather than truncated.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    projection = projection_for(fields, default_fields)
+    if projection is None:
+        if export_format != "ndjson":
+            raise HTTPException(status_code=400, detail="fields=all is only supported for ndjson exports")
+        projection = HIDE_SEARCH_FIELDS
+    columns = ["id"] + [field for field in projection if projection[field]]
+
+    if export_format == "xlsx":
+        matching = await collection.count_documents(filter_query, limit=XLSX_MAX_ROWS + 1)
+        if matching > XLSX_MAX_ROWS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"More than {XLSX_MAX_ROWS} rows match; narrow the filters or export as csv or ndjson"
+            )
+
+    cursor = collection.find(filter_query, projection).sort("_id", 1).batch_size(settings.EXPORT_BATCH_SIZE)
+    docs = _with_string_ids(cursor)
+
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    if export_format == "csv":
+        body = iter_csv(docs, columns)
+    elif export_format == "ndjson":
+        body = iter_ndjson(docs)
+    else:
+        body = iter_xlsx(document_rows(docs, columns), name, columns)
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[export_format], headers=headers)
+
+@router.get("/jobs")
+async def export_jobs(
+    export_format: str = Query("csv", alias="format"),
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    assigned_hr: Optional[str] = None,
+    report_type: Optional[str] = None,
+    search: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    db = await get_database()
+    filter_query, _ = await job_filter(
+        db.recruitment_portal.jobs, status, assigned_hr, report_type, start_date, end_date, search
+    )
+    return await _export(db.recruitment_portal.jobs, "jobs", filter_query, export_format, fields, JOB_EXPORT_FIELDS)
+
+@router.get("/job-history")
+async def export_job_history(
+    export_format: str = Query("csv", alias="format"),
+    fields: Optional[str] = None,
+    search: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    db = await get_database()
+    filter_query, _ = await job_history_filter(db.recruitment_portal.job_history, search)
+    return await _export(db.recruitment_portal.job_history, "job_history", filter_query, export_format, fields, JOB_HISTORY_EXPORT_FIELDS)
+
+@router.get("/candidates")
+async def export_candidates(
+    export_format: str = Query("csv", alias="format"),
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    hr_id: Optional[str] = None,
+    job_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    db = await get_database()
+    filter_query = candidate_filter(status, hr_id, job_id, start_date, end_date)
+    return await _export(db.recruitment_portal.candidates, "candidates", filter_query, export_format, fields, CANDIDATE_SUMMARY_FIELDS)
@@ -1,11 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
+import asyncio
 from datetime import datetime, timezone
 from bson import ObjectId
 from typing import Optional
 from models import CandidateCreate
 from routes.auth import get_current_hr_user, get_password_hash, verify_password
 from database import get_database
-from routes.shared import update_expired_job_statuses
+from user_cache import principal_cache
+from dashboard_counters import JOB_KIND, counters_ready, read_status_counts, record_job_change, record_candidate_change
+from dashboard_stats import job_status_summary, candidate_status_summary
+from pymongo import ReturnDocument
+from search import HIDE_SEARCH_FIELDS
+from pagination import find_page
+from responses import BSONJSONResponse, with_ids
+from fieldsets import projection_for, CANDIDATE_SUMMARY_FIELDS, CANDIDATE_REQUIRED_FIELDS
 
 router = APIRouter(prefix="/hr", tags=["HR"])
 
@@ -17,6 +25,8 @@ async def get_hr_jobs(
     status: Optional[str] = None,
     page: Optional[int] = 1,
     limit: Optional[int] = 25,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
     current_user: dict = Depends(get_current_hr_user)
 ):
     # Validate pagination parameters
@@ -27,46 +37,22 @@ async def get_hr_jobs(
     
     db = await get_database()
     
-    # Update expired job statuses first
-    await update_expired_job_statuses()
-    
     # Build filter query
     filter_query = {"assigned_hr": str(current_user["_id"])}
     if status:
         filter_query["status"] = status
 
-    # Get total count for pagination
-    total_jobs = await db.recruitment_portal.jobs.count_documents(filter_query)
-    
-    # Calculate pagination
-    total_pages = (total_jobs + limit - 1) // limit
-    skip = (page - 1) * limit
-    
-    # Get paginated jobs
-    jobs = await db.recruitment_portal.jobs.find(filter_query).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
-    
-    for job in jobs:
-        job["id"] = str(job["_id"])
-        del job["_id"]
-        # Convert datetime fields to ISO format for JSON serialization
-        if "created_at" in job and isinstance(job["created_at"], datetime):
-            job["created_at"] = job["created_at"].isoformat()
-        if "start_date" in job and isinstance(job["start_date"], datetime):
-            job["start_date"] = job["start_date"].isoformat()
-        if "end_date" in job and isinstance(job["end_date"], datetime):
-            job["end_date"] = job["end_date"].isoformat()
+    # Get paginated jobs (by page, or after a cursor when one is passed)
+    jobs, pagination = await find_page(
+        db.recruitment_portal.jobs, filter_query, "created_at",
+        page=page, limit=limit, cursor=cursor, count=count, projection=HIDE_SEARCH_FIELDS,
+        total_key="total_jobs"
+    )
     
-    return {
-        "jobs": jobs,
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total_jobs": total_jobs,
-            "total_pages": total_pages,
-            "has_next": page < total_pages,
-            "has_prev": page > 1
-        }
-    }
+    return BSONJSONResponse({
+        "jobs": with_ids(jobs),
+        "pagination": pagination
+    })
 
 @router.put("/jobs/{job_id}/status")
 async def update_job_status(
@@ -79,19 +65,23 @@ async def update_job_status(
     db = await get_database()
     
     # Find job by job_id field instead of _id
-    result = await db.recruitment_portal.jobs.update_one(
+    previous_job = await db.recruitment_portal.jobs.find_one_and_update(
         {"job_id": job_id, "assigned_hr": str(current_user["_id"])} ,
-        {"$set": {"status": status}}
+        {"$set": {"status": status}},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not previous_job or previous_job.get("status") == status:
         raise HTTPException(status_code=404, detail="Job not found or not allocated to you")
     
+    await record_job_change(previous_job, {**previous_job, "status": status})
+    
     return {"message": "Job status updated successfully"}
 
 @router.get("/candidates/{job_id}")
 async def get_candidates_for_job(
     job_id: str,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_hr_user)
 ):
     db = await get_database()
@@ -105,15 +95,10 @@ async def get_candidates_for_job(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found or not allocated to you")
     
-    candidates = await db.recruitment_portal.candidates.find({"job_id": job_id}).to_list(length=100)
+    projection = projection_for(fields, CANDIDATE_SUMMARY_FIELDS, CANDIDATE_REQUIRED_FIELDS)
+    candidates = await db.recruitment_portal.candidates.find({"job_id": job_id}, projection).to_list(length=100)
     
-    for candidate in candidates:
-        candidate["id"] = str(candidate["_id"])
-        del candidate["_id"]
-        # Convert datetime fields to ISO format for JSON serialization
-        if "created_at" in candidate and isinstance(candidate["created_at"], datetime):
-            candidate["created_at"] = candidate["created_at"].isoformat()
-        
+    for candidate in with_ids(candidates):
         # Add job title information
         if candidate.get("job_id"):
             candidate["job_title"] = job.get("title")
@@ -122,7 +107,7 @@ async def get_candidates_for_job(
             if not candidate.get("role_applied_for"):
                 candidate["role_applied_for"] = job.get("title")
     
-    return candidates
+    return BSONJSONResponse(candidates)
 
 @router.put("/candidates/{candidate_id}/status")
 async def update_candidate_status(
@@ -170,26 +155,22 @@ async def update_candidate_status(
     }
     
     await db.recruitment_portal.application_history.insert_one(history_entry)
+    await record_candidate_change(candidate, {**candidate, "status": status})
     
     return {"message": "Candidate status updated successfully"}
 
 @router.get("/candidates")
-async def get_all_hr_candidates(current_user: dict = Depends(get_current_hr_user)):
+async def get_all_hr_candidates(fields: Optional[str] = None, current_user: dict = Depends(get_current_hr_user)):
     db = await get_database()
     
     # Get jobs allocated to this HR
-    jobs = await db.recruitment_portal.jobs.find({"assigned_hr": str(current_user["_id"])}).to_list(length=100)
+    jobs = await db.recruitment_portal.jobs.find({"assigned_hr": str(current_user["_id"])}, {"job_id": 1, "title": 1}).to_list(length=100)
     job_id_list = [job["job_id"] for job in jobs]
     job_map = {job["job_id"]: job["title"] for job in jobs}
     
-    candidates = await db.recruitment_portal.candidates.find({"job_id": {"$in": job_id_list}}).to_list(length=100)
-    for candidate in candidates:
-        candidate["id"] = str(candidate["_id"])
-        del candidate["_id"]
-        # Convert datetime fields to ISO format for JSON serialization
-        if "created_at" in candidate and isinstance(candidate["created_at"], datetime):
-            candidate["created_at"] = candidate["created_at"].isoformat()
-        
+    projection = projection_for(fields, CANDIDATE_SUMMARY_FIELDS, CANDIDATE_REQUIRED_FIELDS)
+    candidates = await db.recruitment_portal.candidates.find({"job_id": {"$in": job_id_list}}, projection).to_list(length=100)
+    for candidate in with_ids(candidates):
         # Add job title information
         if candidate.get("job_id"):
             candidate["applied_for"] = job_map.get(candidate["job_id"], "Unknown Job")
@@ -201,43 +182,49 @@ async def get_all_hr_candidates(current_user: dict = Depends(get_current_hr_user
             if not candidate.get("role_applied_for"):
                 candidate["role_applied_for"] = job_map.get(candidate["job_id"], "Unknown Job")
     
-    return candidates
+    return BSONJSONResponse(candidates)
 
 @router.get("/dashboard")
 async def get_hr_dashboard(current_user: dict = Depends(get_current_hr_user)):
     db = await get_database()
     
-    # Get job counts
-    total_jobs = await db.recruitment_portal.jobs.count_documents({"assigned_hr": str(current_user["_id"])})
-    open_jobs = await db.recruitment_portal.jobs.count_documents({"assigned_hr": str(current_user["_id"]), "status": "open"})
-    closed_jobs = await db.recruitment_portal.jobs.count_documents({"assigned_hr": str(current_user["_id"]), "status": "closed"})
-    submitted_jobs = await db.recruitment_portal.jobs.count_documents({"assigned_hr": str(current_user["_id"]), "status": "submitted"})
-    demand_closed_jobs = await db.recruitment_portal.jobs.count_documents({"assigned_hr": str(current_user["_id"]), "status": "demand closed"})
-    
-    # Get candidate counts using job_id (string)
-    jobs = await db.recruitment_portal.jobs.find({"assigned_hr": str(current_user["_id"])}).to_list(length=100)
-    job_id_list = [job["job_id"] for job in jobs]
-    total_candidates = await db.recruitment_portal.candidates.count_documents({"job_id": {"$in": job_id_list}})
-    applied_candidates = await db.recruitment_portal.candidates.count_documents({"job_id": {"$in": job_id_list}, "status": "applied"})
-    screen_reject_candidates = await db.recruitment_portal.candidates.count_documents({"job_id": {"$in": job_id_list}, "status": "screen_reject"})
-    interview_selected_candidates = await db.recruitment_portal.candidates.count_documents({"job_id": {"$in": job_id_list}, "status": "interview_selected"})
-    interview_reject_candidates = await db.recruitment_portal.candidates.count_documents({"job_id": {"$in": job_id_list}, "status": "interview_reject"})
-    no_show_for_joining_candidates = await db.recruitment_portal.candidates.count_documents({"job_id": {"$in": job_id_list}, "status": "no_show_for_joining"})
-    placed_candidates = await db.recruitment_portal.candidates.count_documents({"job_id": {"$in": job_id_list}, "status": "placed"})
+    hr_id = str(current_user["_id"])
+    
+    async def get_job_counts():
+        if await counters_ready():
+            # Read the materialized dashboard counters instead of counting jobs
+            return await read_status_counts(JOB_KIND, hr_id)
+        groups = await db.recruitment_portal.jobs.aggregate([
+            {"$match": {"assigned_hr": hr_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        return {group["_id"]: group["count"] for group in groups}
+    
+    async def get_candidate_counts():
+        # Join the HR's jobs to their candidates by job_id and count per status in one pipeline.
+        # Grouping by job_id first keeps the counts exact even if a job_id occurs twice.
+        groups = await db.recruitment_portal.jobs.aggregate([
+            {"$match": {"assigned_hr": hr_id}},
+            {"$group": {"_id": "$job_id"}},
+            {"$lookup": {
+                "from": "candidates",
+                "let": {"job_id": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$job_id", "$$job_id"]}}},
+                    {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+                ],
+                "as": "status_counts"
+            }},
+            {"$unwind": "$status_counts"},
+            {"$group": {"_id": "$status_counts._id", "count": {"$sum": "$status_counts.count"}}}
+        ]).to_list(length=None)
+        return {group["_id"]: group["count"] for group in groups}
+    
+    job_counts, candidate_counts = await asyncio.gather(get_job_counts(), get_candidate_counts())
     
     return {
-        "total_jobs": total_jobs,
-        "open_jobs": open_jobs,
-        "closed_jobs": closed_jobs,
-        "submitted_jobs": submitted_jobs,
-        "demand_closed_jobs": demand_closed_jobs,
-        "total_candidates": total_candidates,
-        "applied_candidates": applied_candidates,
-        "screen_reject_candidates": screen_reject_candidates,
-        "interview_selected_candidates": interview_selected_candidates,
-        "interview_reject_candidates": interview_reject_candidates,
-        "no_show_for_joining_candidates": no_show_for_joining_candidates,
-        "placed_candidates": placed_candidates
+        **job_status_summary(job_counts),
+        **candidate_status_summary(candidate_counts)
     }
 
 @router.put("/change-password")
@@ -253,17 +240,18 @@ async def change_password(
     db = await get_database()
     
     # Verify current password
-    if not verify_password(current_password, current_user["password"]):
+    if not await verify_password(current_password, current_user["password"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Hash new password
-    hashed_new_password = get_password_hash(new_password)
+    hashed_new_password = await get_password_hash(new_password)
     
     # Update password in database
     result = await db.recruitment_portal.users.update_one(
         {"_id": current_user["_id"]},
         {"$set": {"password": hashed_new_password}}
     )
+    principal_cache.invalidate_user_id(current_user["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="Failed to update password")
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from metrics import render, PROMETHEUS_MEDIA_TYPE
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus text exposition of request, MongoDB, scheduler and password hashing metrics.
+    """
+    return Response(content=await render(), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
+import time
 from bson import ObjectId
 from typing import Optional, List
 from models import CandidateCreate, CandidateUpdate
@@ -7,106 +8,213 @@ from routes.auth import get_current_user, get_current_admin_user, get_current_hr
 from database import get_database
 from fastapi.responses import JSONResponse
 from config import settings
+from pymongo.errors import BulkWriteError, OperationFailure
+from dashboard_counters import record_jobs_removed, record_candidate_change
+from job_fields import start_of_day
+from search import HIDE_SEARCH_FIELDS
+from responses import BSONJSONResponse, with_id, with_ids
 
 router = APIRouter(tags=["Shared"])
 
+# Set after the first attempt to use a transaction (False on standalone servers)
+_transactions_supported: Optional[bool] = None
+
+def _expired_jobs_pipeline(expires_before: datetime, last_id, chunk_size: int) -> list:
+    """
+    Find one chunk of open jobs past their end date, annotated with whether they have
+    a selected/placed candidate and whether they were already archived.
+    """
+    match_stage = {"status": "open", "end_date": {"$lt": expires_before}}
+    if last_id is not None:
+        match_stage["_id"] = {"$gt": last_id}
+    
+    return [
+        {"$match": match_stage},
+        {"$sort": {"_id": 1}},
+        {"$limit": chunk_size},
+        {"$lookup": {
+            "from": "candidates",
+            "let": {"job_id": "$job_id"},
+            "pipeline": [
+                {"$match": {
+                    "$expr": {"$eq": ["$job_id", "$$job_id"]},
+                    "status": {"$in": ["interview_selected", "placed"]}
+                }},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "_selected_candidates"
+        }},
+        {"$lookup": {
+            "from": "job_history",
+            "let": {"original_job_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$original_job_id", "$$original_job_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "_existing_history"
+        }}
+    ]
+
+async def _archive_and_delete(db, history_docs: list, job_ids: list, removed_jobs: list,
+                              timings: dict, session=None) -> int:
+    """
+    Insert the history documents, delete the original jobs and update the dashboard counters,
+    recording per-phase timings. With a session the counters commit together with the move.
+    """
+    started = time.perf_counter()
+    try:
+        await db.recruitment_portal.job_history.insert_many(history_docs, ordered=False, session=session)
+    except BulkWriteError as e:
+        # Duplicates mean the job is already archived; anything else is a real failure
+        if session is not None or any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+    timings["archive_seconds"] += time.perf_counter() - started
+    
+    started = time.perf_counter()
+    result = await db.recruitment_portal.jobs.delete_many({"_id": {"$in": job_ids}}, session=session)
+    timings["delete_seconds"] += time.perf_counter() - started
+    
+    await record_jobs_removed(removed_jobs, session=session)
+    return result.deleted_count
+
+async def _move_chunk_to_history(db, history_docs: list, job_ids: list, removed_jobs: list, timings: dict) -> int:
+    """Move one chunk to job_history, inside a transaction where the deployment supports it."""
+    global _transactions_supported
+    
+    if _transactions_supported is not False:
+        try:
+            # with_transaction re-runs the callback on transient errors, so each attempt is
+            # timed on its own and only the one that committed is added to the report
+            attempt_timings = {}
+            async with await db.start_session() as session:
+                async def callback(session):
+                    attempt_timings.update(archive_seconds=0.0, delete_seconds=0.0)
+                    return await _archive_and_delete(
+                        db, history_docs, job_ids, removed_jobs, attempt_timings, session=session
+                    )
+                deleted = await session.with_transaction(callback)
+            for phase, seconds in attempt_timings.items():
+                timings[phase] += seconds
+            _transactions_supported = True
+            return deleted
+        except OperationFailure as e:
+            # Code 20 (IllegalOperation) is returned by standalone servers without transaction support
+            if e.code != 20:
+                raise
+            print("Transactions are not supported by this deployment; archiving without a transaction")
+            _transactions_supported = False
+    
+    return await _archive_and_delete(db, history_docs, job_ids, removed_jobs, timings)
+
 async def update_expired_job_statuses():
     """
     Shared function to update job statuses for expired jobs.
-    Checks all open jobs that have passed their end date and updates them to 'demand closed'
-    if they don't have any selected candidates. Moves these jobs to job_history collection
-    and deletes them from the original collection.
+    Finds open jobs that have passed their end date and have no selected or placed candidates,
+    moves them to the job_history collection as 'demand_closed' and deletes them from jobs.
+    Works through the whole backlog in chunks of JOB_EXPIRY_SWEEP_CHUNK_SIZE and returns a
+    report with per-phase counts and timings.
     """
+    report = {
+        "scanned": 0,
+        "archived": 0,
+        "skipped_with_candidates": 0,
+        "skipped_already_archived": 0,
+        "chunks": 0,
+        "timings": {
+            "find_seconds": 0.0,
+            "archive_seconds": 0.0,
+            "delete_seconds": 0.0,
+            "total_seconds": 0.0
+        }
+    }
+    timings = report["timings"]
+    sweep_started = time.perf_counter()
+    
     try:
         db = await get_database()
         now = datetime.now(timezone.utc)
+        chunk_size = settings.JOB_EXPIRY_SWEEP_CHUNK_SIZE
         
-        # Find all open jobs that have passed their end date
-        # Convert current date to string format for comparison
-        current_date_str = now.strftime("%Y-%m-%d")
-        
-        open_jobs_past_end = await db.recruitment_portal.jobs.find({
-            "status": "open", 
-            "end_date": {"$lte": current_date_str}
-        }).to_list(length=settings.MAX_QUERY_LIMIT_MEDIUM)
+        # Jobs whose end date is today or earlier have expired
+        expires_before = start_of_day(now) + timedelta(days=1)
         
-        print(f"Found {len(open_jobs_past_end)} open jobs past end date")
-        
-        updated_count = 0
-        for job in open_jobs_past_end:
-            try:
-                # Check if any candidate for this job is interview_selected or placed
-                selected = await db.recruitment_portal.candidates.find_one({
-                    "job_id": job["job_id"], 
-                    "status": {"$in": ["interview_selected", "placed"]}
-                })
+        last_id = None
+        while True:
+            started = time.perf_counter()
+            chunk = await db.recruitment_portal.jobs.aggregate(
+                _expired_jobs_pipeline(expires_before, last_id, chunk_size)
+            ).to_list(length=None)
+            timings["find_seconds"] += time.perf_counter() - started
+            
+            if not chunk:
+                break
+            
+            report["chunks"] += 1
+            report["scanned"] += len(chunk)
+            last_id = chunk[-1]["_id"]
+            
+            history_docs = []
+            job_ids = []
+            removed_jobs = []
+            for job in chunk:
+                if job.pop("_selected_candidates"):
+                    report["skipped_with_candidates"] += 1
+                    continue
+                if job.pop("_existing_history"):
+                    report["skipped_already_archived"] += 1
+                    continue
                 
-                if not selected:
-                    # Check if job already exists in job_history to prevent duplicates
-                    existing_in_history = await db.recruitment_portal.job_history.find_one({
-                        "original_job_id": job["_id"]
-                    })
-                    
-                    if existing_in_history:
-                        print(f"Job {job.get('job_id', 'unknown')} already exists in job_history, skipping")
-                        continue
-                    
-                    # No selected candidates found, move to job_history and delete from original
-                    # Update job status to demand_closed before moving to history
-                    job["status"] = "demand_closed"
-                    
-                    # Add additional fields for history tracking
-                    job_history_doc = {
-                        **job,
-                        "moved_to_history_date": now,
-                        "moved_to_history_reason": "end_date_passed_no_candidates",
-                        "original_job_id": job["_id"]
-                    }
-                    
-                    # Remove the _id field from the history document to avoid ObjectId serialization issues
-                    # MongoDB will generate a new _id for the history document
-                    if "_id" in job_history_doc:
-                        del job_history_doc["_id"]
-                    
-                    # Insert into job_history collection
-                    await db.recruitment_portal.job_history.insert_one(job_history_doc)
-                    
-                    # Delete from original collection
-                    result = await db.recruitment_portal.jobs.delete_one({"_id": job["_id"]})
-                    
-                    if result.deleted_count > 0:
-                        updated_count += 1
-                        print(f"Moved job {job.get('job_id', 'unknown')} to job_history and deleted from original")
-            except Exception as e:
-                print(f"Error processing job {job.get('job_id', 'unknown')}: {e}")
-                continue
-        
-        print(f"Total jobs moved to history and deleted: {updated_count}")
-        return updated_count
+                removed_jobs.append({key: job.get(key) for key in ("assigned_hr", "status", "start_date")})
+                
+                # MongoDB generates a new _id for the history document
+                job_id = job.pop("_id")
+                job["status"] = "demand_closed"
+                history_docs.append({
+                    **job,
+                    "moved_to_history_date": now,
+                    "moved_to_history_reason": "end_date_passed_no_candidates",
+                    "original_job_id": job_id
+                })
+                job_ids.append(job_id)
+            
+            if history_docs:
+                report["archived"] += await _move_chunk_to_history(db, history_docs, job_ids, removed_jobs, timings)
+            
+            if len(chunk) < chunk_size:
+                break
     except Exception as e:
         print(f"Error in update_expired_job_statuses: {e}")
-        return 0
+        report["error"] = str(e)
+    
+    timings["total_seconds"] = time.perf_counter() - sweep_started
+    print(
+        f"Expiry sweep: scanned {report['scanned']} jobs in {report['chunks']} chunks, "
+        f"archived {report['archived']}, skipped {report['skipped_with_candidates']} with candidates "
+        f"and {report['skipped_already_archived']} already archived "
+        f"(find {timings['find_seconds']:.3f}s, archive {timings['archive_seconds']:.3f}s, "
+        f"delete {timings['delete_seconds']:.3f}s, total {timings['total_seconds']:.3f}s)"
+    )
+    return report
 
 @router.get("/jobs/{job_id}")
 async def get_job_details(job_id: str, current_user: dict = Depends(get_current_user)):
     db = await get_database()
     
     # Try to find job by job_id field first, then by _id
-    job = await db.recruitment_portal.jobs.find_one({"job_id": job_id})
+    job = await db.recruitment_portal.jobs.find_one({"job_id": job_id}, HIDE_SEARCH_FIELDS)
     if not job:
         # Fallback to _id if job_id not found
         try:
-            job = await db.recruitment_portal.jobs.find_one({"_id": ObjectId(job_id)})
+            job = await db.recruitment_portal.jobs.find_one({"_id": ObjectId(job_id)}, HIDE_SEARCH_FIELDS)
         except:
             pass
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job["id"] = str(job["_id"])
-    del job["_id"]
-    
-    return job
+    return BSONJSONResponse(with_id(job))
 
 @router.get("/candidates/{candidate_id}")
 async def get_candidate_details(candidate_id: str, current_user: dict = Depends(get_current_user)):
@@ -118,7 +226,7 @@ async def get_candidate_details(candidate_id: str, current_user: dict = Depends(
     
     # Get job information if job_id exists
     if candidate.get("job_id"):
-        job = await db.recruitment_portal.jobs.find_one({"job_id": candidate["job_id"]})
+        job = await db.recruitment_portal.jobs.find_one({"job_id": candidate["job_id"]}, {"title": 1})
         if job:
             candidate["job_title"] = job.get("title")
             # Ensure title_position and role_applied_for are set to job title if not already set
@@ -127,10 +235,7 @@ async def get_candidate_details(candidate_id: str, current_user: dict = Depends(
             if not candidate.get("role_applied_for"):
                 candidate["role_applied_for"] = job.get("title")
     
-    candidate["id"] = str(candidate["_id"])
-    del candidate["_id"]
-    
-    return candidate
+    return BSONJSONResponse(with_id(candidate))
 
 @router.post("/candidates")
 async def create_candidate(candidate: CandidateCreate, current_user: dict = Depends(get_current_user)):
@@ -172,6 +277,7 @@ async def create_candidate(candidate: CandidateCreate, current_user: dict = Depe
     candidate_data["role_applied_for"] = job.get("title")
     
     result = await db.recruitment_portal.candidates.insert_one(candidate_data)
+    await record_candidate_change(None, candidate_data)
     candidate_data["id"] = str(result.inserted_id)
     # Remove MongoDB _id if present
     candidate_data.pop("_id", None)
@@ -243,6 +349,8 @@ async def update_candidate(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Candidate not found")
     
+    await record_candidate_change(current_candidate, {**current_candidate, **update_data})
+    
     return {"message": "Candidate updated successfully"}
 
 @router.put("/candidates/{candidate_id}/status")
@@ -278,6 +386,7 @@ async def update_candidate_status(
         "comment": notes
     }
     await db.recruitment_portal.application_history.insert_one(history_entry)
+    await record_candidate_change(candidate, {**candidate, "status": status})
     return {"message": "Candidate status updated successfully"}
 
 @router.delete("/candidates/{candidate_id}")
@@ -306,6 +415,8 @@ async def delete_candidate(candidate_id: str, current_user: dict = Depends(get_c
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Candidate not found")
     
+    await record_candidate_change(candidate, None)
+    
     return {"message": "Candidate deleted successfully"}
 
 @router.get("/application-history/{candidate_id}")
@@ -315,11 +426,4 @@ async def get_application_history(candidate_id: str, current_user: dict = Depend
         {"candidate_id": candidate_id}
     ).sort("timestamp", -1).to_list(length=settings.MAX_QUERY_LIMIT)
     
-    for entry in history:
-        entry["id"] = str(entry["_id"])
-        del entry["_id"]
-        # Convert datetime to ISO format for JSON serialization
-        if "timestamp" in entry and isinstance(entry["timestamp"], datetime):
-            entry["timestamp"] = entry["timestamp"].isoformat()
-    
-    return history 
\ No newline at end of file
+    return BSONJSONResponse(with_ids(history)) 
\ No newline at end of file
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from config import settings
+from metrics import current_origin
+
+logger = logging.getLogger(__name__)
+
+class ScheduledJob:
+    """A periodic background job and its run statistics."""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable], interval_seconds: float,
+                 jitter_seconds: float = 0, run_at_start: bool = True):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+        self.run_at_start = run_at_start
+        self.lock = asyncio.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.skipped_overlaps = 0
+        self.total_duration_seconds = 0.0
+        self.max_duration_seconds = 0.0
+        self.last_duration_seconds: Optional[float] = None
+        self.last_started_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def next_delay(self) -> float:
+        """Seconds until the next run, counted from the end of the previous one."""
+        return self.interval_seconds + random.uniform(0, self.jitter_seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "running": self.lock.locked(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_overlaps": self.skipped_overlaps,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_duration_seconds": self.last_duration_seconds,
+            "total_duration_seconds": self.total_duration_seconds,
+            "avg_duration_seconds": self.total_duration_seconds / self.runs if self.runs else 0.0,
+            "max_duration_seconds": self.max_duration_seconds,
+            "last_error": self.last_error
+        }
+
+class Scheduler:
+    """
+    Runs registered periodic jobs on the event loop, one loop task per job.
+    A job never overlaps with itself (a run requested while one is in progress is skipped),
+    each wait gets random jitter so workers do not fire in lockstep, and shutdown() cancels
+    everything, including one-off background tasks started through spawn().
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._background: set = set()
+
+    def register(self, name: str, func: Callable[[], Awaitable], interval_seconds: float,
+                 jitter_seconds: float = 0, run_at_start: bool = True) -> ScheduledJob:
+        if name in self._jobs:
+            raise ValueError(f"Scheduled job {name} is already registered")
+        job = ScheduledJob(name, func, interval_seconds, jitter_seconds, run_at_start)
+        self._jobs[name] = job
+        return job
+
+    def start(self):
+        for name, job in self._jobs.items():
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._loop(job), name=f"scheduler:{name}")
+
+    def spawn(self, name: str, coro: Awaitable) -> asyncio.Task:
+        """Run a one-off background coroutine that is cancelled at shutdown if still running."""
+        task = asyncio.create_task(self._run_background(name, coro), name=f"background:{name}")
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _run_background(self, name: str, coro: Awaitable):
+        current_origin.set(f"background:{name}")
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.error("Background task %s failed", name, exc_info=True)
+
+    async def run_once(self, name: str) -> bool:
+        """Run a job now. Returns False if it was skipped because a run is already in progress."""
+        job = self._jobs[name]
+        if job.lock.locked():
+            job.skipped_overlaps += 1
+            return False
+
+        async with job.lock:
+            token = current_origin.set(f"scheduler:{name}")
+            job.last_started_at = datetime.now(timezone.utc)
+            started = time.perf_counter()
+            try:
+                await job.func()
+                job.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.failures += 1
+                job.last_error = str(e)
+                logger.error("Scheduled job %s failed", name, exc_info=True)
+            finally:
+                duration = time.perf_counter() - started
+                job.runs += 1
+                job.last_duration_seconds = duration
+                job.total_duration_seconds += duration
+                job.max_duration_seconds = max(job.max_duration_seconds, duration)
+                current_origin.reset(token)
+        return True
+
+    async def _loop(self, job: ScheduledJob):
+        # Spread the first run over the jitter window as well
+        await asyncio.sleep(random.uniform(0, job.jitter_seconds) if job.run_at_start else job.next_delay())
+        while True:
+            await self.run_once(job.name)
+            await asyncio.sleep(job.next_delay())
+
+    async def shutdown(self, timeout: float = None):
+        """Cancel all job loops and background tasks and wait (up to `timeout`) for them to stop."""
+        timeout = settings.SCHEDULER_SHUTDOWN_TIMEOUT_SECONDS if timeout is None else timeout
+        tasks = list(self._tasks.values()) + list(self._background)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        self._tasks.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "jobs": {name: job.snapshot() for name, job in self._jobs.items()},
+            "background_tasks": sorted(task.get_name() for task in self._background)
+        }
+
+scheduler = Scheduler()
@@ -0,0 +1,59 @@
+from typing import List, Optional, Tuple
+
+# Text index over the descriptive job fields, used by jobs and job_history
+TEXT_INDEX_KEYS = [("title", "text"), ("location", "text"), ("description", "text")]
+TEXT_INDEX_WEIGHTS = {"title": 10, "location": 5, "description": 1}
+
+# Shortest ID prefix that is indexed, so one character does not match every job
+MIN_PREFIX_LENGTH = 2
+ID_FIELDS = ("job_id", "csa_id")
+
+# Keeps the search helper field out of API responses
+HIDE_SEARCH_FIELDS = {"search_prefixes": 0}
+
+def id_prefixes(*ids: Optional[str]) -> List[str]:
+    """Lower-cased edge n-grams of the given IDs, e.g. "jb0412" -> ["jb", "jb0", "jb04", ...]."""
+    prefixes = set()
+    for value in ids:
+        text = str(value or "").strip().lower()
+        for length in range(MIN_PREFIX_LENGTH, len(text) + 1):
+            prefixes.add(text[:length])
+    return sorted(prefixes)
+
+def set_search_fields(job: dict) -> dict:
+    """Keep search_prefixes in step with job_id and csa_id on a job document."""
+    job["search_prefixes"] = id_prefixes(*(job.get(field) for field in ID_FIELDS))
+    return job
+
+async def search_filter(collection, search: Optional[str]) -> Tuple[dict, bool]:
+    """
+    Filter for a free-text job search, and whether results should be ranked by text score.
+    A search that exactly matches a job_id or csa_id returns just those jobs; otherwise the
+    terms are matched against the text index and, for single words, against ID prefixes.
+    Results are only ranked when $text is the whole search clause.
+    """
+    search = (search or "").strip()
+    if not search:
+        return {}, False
+
+    terms = search.split()
+    if len(terms) == 1:
+        # Exact ID fast path on the unique job_id / csa_id indexes
+        exact = {"$or": [{field: search} for field in ID_FIELDS]}
+        if await collection.find_one(exact, {"_id": 1}):
+            return exact, False
+
+    text_clause = {"$text": {"$search": search}}
+    if len(terms) == 1 and len(search) >= MIN_PREFIX_LENGTH:
+        prefix_clause = {"search_prefixes": search.lower()}
+        if await collection.find_one(prefix_clause, {"_id": 1}):
+            # Prefix-only hits carry no text score, so a mixed result cannot be ranked
+            # by it; keep the list's default order instead
+            return {"$or": [text_clause, prefix_clause]}, False
+    return text_clause, True
+
+def search_sort(ranked: bool, default_sort: list) -> list:
+    """Sort by relevance first when the query was a text search."""
+    if ranked:
+        return [("score", {"$meta": "textScore"})] + default_sort
+    return default_sort
@@ -0,0 +1,268 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from bson import json_util
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+from config import settings
+from metrics import current_origin, origin_label
+
+SLOW_QUERIES_COLLECTION = "slow_queries"
+
+# Commands whose plan explain("executionStats") can report without side effects
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+# Where each command keeps its filter (update/delete carry a list of statements)
+FILTER_FIELDS = {
+    "find": "filter", "count": "query", "distinct": "query", "findAndModify": "query",
+    "update": "updates", "delete": "deletes", "aggregate": "pipeline"
+}
+
+# Session, transaction, cluster and cursor bookkeeping the driver adds; not part of the
+# query, and explain is rejected inside a transaction
+DRIVER_FIELDS = {
+    "lsid", "$clusterTime", "$db", "$readPreference", "signature", "cursor",
+    "txnNumber", "autocommit", "startTransaction", "readConcern"
+}
+
+def redact(value):
+    """
+    Replace every literal in a filter with "?" while keeping field names and operators,
+    so {"status": "active", "job_id": {"$in": ["jb1", "jb2"]}} becomes
+    {"status": "?", "job_id": {"$in": ["?"]}}. Lists collapse to their distinct shapes.
+    """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = redact(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+def command_shape(command_name: str, command) -> dict:
+    """Redacted shape of a command: what it filters and sorts on, without the values."""
+    shape = {}
+    field = FILTER_FIELDS.get(command_name)
+    if field == "updates":
+        shape["filter"] = redact([{"q": statement.get("q"), "u": statement.get("u")} for statement in command.get(field, [])])
+    elif field == "deletes":
+        shape["filter"] = redact([statement.get("q") for statement in command.get(field, [])])
+    elif field and field in command:
+        shape["filter"] = redact(command[field])
+    if command.get("sort"):
+        # Sort directions are not sensitive and matter for index choice
+        shape["sort"] = dict(command["sort"])
+    return shape
+
+def _collection_name(command_name: str, command) -> Optional[str]:
+    target = command.get(command_name)
+    return target if isinstance(target, str) else command.get("collection")
+
+def _summarize_plan(plan: Optional[dict]) -> Optional[str]:
+    """Stage chain of a winning plan, e.g. "FETCH <- IXSCAN job_id_1"."""
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage} {plan['indexName']}"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(stages) or None
+
+def summarize_explain(explain: dict) -> dict:
+    """The parts of an explain("executionStats") result worth keeping for every slow query."""
+    planner = explain.get("queryPlanner")
+    stats = explain.get("executionStats")
+    if planner is None and explain.get("stages"):
+        # Aggregations that push down to the query layer report the cursor stage first
+        cursor_stage = explain["stages"][0].get("$cursor", {})
+        planner = cursor_stage.get("queryPlanner")
+        stats = cursor_stage.get("executionStats")
+    planner = planner or {}
+    stats = stats or {}
+    # Only the stage/index chain is kept: the raw plan's filters and index bounds
+    # carry the query's literal values
+    winning_plan = planner.get("winningPlan", {})
+    return {
+        "plan": _summarize_plan(winning_plan.get("queryPlan", winning_plan)),
+        "n_returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "execution_time_ms": stats.get("executionTimeMillis")
+    }
+
+def error_summary(code, code_name, default_name: str = None) -> dict:
+    """
+    Server error code and name only. Error messages are not kept: some quote the offending
+    values (a duplicate key error includes the key).
+    """
+    return {"code": code, "code_name": code_name or default_name}
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Records every Mongo command slower than SLOW_QUERY_THRESHOLD_MS with the route or
+    background job that issued it, its redacted shape and its duration. Read commands also
+    get an explain("executionStats") capture, at most once per shape per cooldown window.
+    Listener callbacks run on the driver's threads, so the recording itself is handed to
+    the event loop. Nothing is recorded until ensure_slow_query_collection() has made sure
+    the sink is ready, so an insert can never create an uncapped slow_queries collection.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self._last_explained: Dict[str, float] = {}
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set = set()
+        self.ready = False
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop):
+        self._client = client
+        self._loop = loop
+
+    def started(self, event):
+        collection = _collection_name(event.command_name, event.command)
+        # Our own explain runs and slow query inserts must not feed back into the log
+        if event.command_name == "explain" or collection == SLOW_QUERIES_COLLECTION:
+            return
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                event.database_name, collection, event.command, origin_label()
+            )
+
+    def _finish(self, event, failure=None):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None or self._loop is None or not self.ready:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._schedule, event.command_name, pending, duration_ms, failure)
+        except RuntimeError:
+            # Event loop already closed (shutdown)
+            pass
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, failure=event.failure)
+
+    def _schedule(self, command_name: str, pending: tuple, duration_ms: float, failure):
+        task = asyncio.create_task(self._record(command_name, pending, duration_ms, failure))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _should_explain(self, command_name: str, command, shape_key: str) -> bool:
+        if command_name not in EXPLAINABLE_COMMANDS:
+            return False
+        if command_name == "aggregate" and any(
+            "$out" in stage or "$merge" in stage for stage in command.get("pipeline", [])
+        ):
+            return False
+        now = time.monotonic()
+        cooldown = settings.SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS
+        # Forget shapes whose cooldown has passed so the map stays bounded
+        self._last_explained = {
+            key: explained_at for key, explained_at in self._last_explained.items() if now - explained_at < cooldown
+        }
+        if shape_key in self._last_explained:
+            return False
+        self._last_explained[shape_key] = now
+        return True
+
+    async def _explain(self, database: str, command) -> dict:
+        explained = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        if "pipeline" in explained:
+            # aggregate requires a cursor option even under explain
+            explained["cursor"] = {}
+        try:
+            result = await self._client[database].command(
+                {"explain": explained, "verbosity": "executionStats"}
+            )
+            return summarize_explain(result)
+        except PyMongoError as e:
+            details = getattr(e, "details", None) or {}
+            return {"error": error_summary(getattr(e, "code", None), details.get("codeName"), type(e).__name__)}
+
+    async def _record(self, command_name: str, pending: tuple, duration_ms: float, failure):
+        database, collection, command, origin = pending
+        shape = command_shape(command_name, command)
+        shape_key = json_util.dumps([collection, command_name, shape], sort_keys=True)
+        # Tag our own commands so they are never attributed to the request that triggered them
+        current_origin.set("slow_query_log")
+
+        record = {
+            "timestamp": datetime.now(timezone.utc),
+            "origin": origin or "unknown",
+            "database": database,
+            "collection": collection,
+            "command": command_name,
+            "shape": shape,
+            "duration_ms": round(duration_ms, 1)
+        }
+        if failure is not None:
+            failure = failure if isinstance(failure, dict) else {}
+            record["failure"] = error_summary(failure.get("code"), failure.get("codeName"))
+        if self._client is not None and self._should_explain(command_name, command, shape_key):
+            record["explain"] = await self._explain(database, command)
+
+        try:
+            await self._write(record)
+        except (OSError, PyMongoError) as e:
+            print(f"Failed to record slow query: {e}")
+
+    async def _write(self, record: dict):
+        if settings.SLOW_QUERY_LOG_FILE:
+            line = json_util.dumps(record) + "\n"
+            await asyncio.to_thread(_append_line, settings.SLOW_QUERY_LOG_FILE, line)
+        else:
+            await self._client.recruitment_portal[SLOW_QUERIES_COLLECTION].insert_one(record)
+
+    async def drain(self, timeout: float):
+        """Wait for in-flight recordings at shutdown (explains can take a while)."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+def _append_line(path: str, line: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(line)
+
+async def ensure_slow_query_collection(database):
+    """
+    Make sure slow_queries exists and is capped, so the log can never grow unbounded, then
+    let the listener start recording. An existing uncapped collection (e.g. auto-created by
+    an insert) is converted; if that fails, recording stays off. Never raises.
+    """
+    if settings.SLOW_QUERY_LOG_FILE:
+        slow_query_listener.ready = True
+        return
+    size = settings.SLOW_QUERY_COLLECTION_MAX_BYTES
+    try:
+        try:
+            await database.create_collection(SLOW_QUERIES_COLLECTION, capped=True, size=size)
+            print("Created capped slow_queries collection")
+        except CollectionInvalid:
+            # Already exists (possibly created by another worker just now)
+            options = await database[SLOW_QUERIES_COLLECTION].options()
+            if not options.get("capped"):
+                print("slow_queries collection is not capped; converting it")
+                await database.command({"convertToCapped": SLOW_QUERIES_COLLECTION, "size": size})
+    except PyMongoError as e:
+        print(f"Slow query log disabled: could not prepare a capped slow_queries collection: {e}")
+        return
+    slow_query_listener.ready = True
+
+slow_query_listener = SlowQueryListener()
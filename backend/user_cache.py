@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import settings
+
+class PrincipalCache:
+    """
+    In-process LRU cache of authenticated user documents keyed by token subject (email).
+    Entries expire after a TTL so that writes made by other workers are picked up
+    without an explicit invalidation.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+
+    def get(self, subject: str) -> Optional[dict]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[subject]
+            return None
+
+        # Mark as most recently used
+        self._entries.move_to_end(subject)
+        # Hand out a copy so request handlers cannot mutate the cached principal
+        return dict(user)
+
+    def set(self, subject: str, user: dict):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+
+        self._entries[subject] = (time.monotonic() + self.ttl_seconds, dict(user))
+        self._entries.move_to_end(subject)
+
+        # Evict least recently used entries
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        self._entries.pop(subject, None)
+
+    def invalidate_user_id(self, user_id):
+        """Drop every cached principal belonging to the given user _id (ObjectId or str)."""
+        user_id = str(user_id)
+        stale = [subject for subject, (_, user) in self._entries.items() if str(user.get("_id")) == user_id]
+        for subject in stale:
+            del self._entries[subject]
+
+    def clear(self):
+        self._entries.clear()
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
@@ -708,8 +708,8 @@ const EditJobForm = ({ job, hrUsers, salaryBands, onUpdate, onCancel }) => {
     priority: job.priority || '',
     status: job.status || 'open',
     assigned_hr: job.assigned_hr || '',
-    start_date: job.start_date || '',
-    end_date: job.end_date || '',
+    start_date: job.start_date ? job.start_date.slice(0, 10) : '',
+    end_date: job.end_date ? job.end_date.slice(0, 10) : '',
     csa_id: job.csa_id || ''
   })
 
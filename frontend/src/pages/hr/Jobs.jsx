@@ -8,6 +8,7 @@ import DatePicker from 'react-datepicker'
 import 'react-datepicker/dist/react-datepicker.css'
 
 import Pagination from '../../components/Pagination'
+import { exportCandidateToDoc } from '../../services/candidateExport'
 
 // Animation variants for consistent animations
 const pageVariants = {
@@ -895,9 +896,16 @@ const CandidatesList = ({ jobId }) => {
     setShowUpdateStatusModal(true)
   }
 
-  const handleViewCandidate = (candidate) => {
-    setSelectedCandidate(candidate)
-    setShowViewModal(true)
+  // The list only carries summary fields, so load the full candidate for the modal
+  const handleViewCandidate = async (candidate) => {
+    try {
+      const response = await api.get(`/candidates/${candidate.id}`)
+      setSelectedCandidate(response.data)
+      setShowViewModal(true)
+    } catch (error) {
+      console.error('Error fetching candidate details:', error)
+      toast.error('Failed to fetch candidate details')
+    }
   }
 
   const handleDeleteCandidate = async (candidateId) => {
@@ -914,25 +922,14 @@ const CandidatesList = ({ jobId }) => {
     }
   }
 
-  const exportCandidateToDoc = async (candidate) => {
+  // The list only carries summary fields, so load the full candidate before exporting
+  const handleExportCandidate = async (candidateId) => {
     try {
-      const response = await api.get(`/candidates/${candidate.id}/export`, {
-        responseType: 'blob'
-      })
-      
-      const url = window.URL.createObjectURL(new Blob([response.data]))
-      const link = document.createElement('a')
-      link.href = url
-      link.setAttribute('download', `${candidate.name}_profile.docx`)
-      document.body.appendChild(link)
-      link.click()
-      link.remove()
-      window.URL.revokeObjectURL(url)
-      
-      toast.success('Candidate profile exported successfully!')
+      const response = await api.get(`/candidates/${candidateId}`)
+      await exportCandidateToDoc(response.data)
     } catch (error) {
-      console.error('Export error:', error)
-      toast.error('Failed to export candidate profile')
+      console.error('Error fetching candidate details:', error)
+      toast.error('Failed to fetch candidate details')
     }
   }
 
@@ -1050,7 +1047,7 @@ const CandidatesList = ({ jobId }) => {
                       <Edit className="h-4 w-4" />
                     </button>
                     <button
-                      onClick={() => exportCandidateToDoc(candidate)}
+                      onClick={() => handleExportCandidate(candidate.id)}
                       className="text-purple-600 hover:text-purple-800 p-1 hover:bg-purple-50 rounded transition-colors duration-200"
                       title="Export Details"
                     >